@@ -0,0 +1,71 @@
+"""Deterministic synthetic audio used by the benchmarks."""
+import subprocess
+from io import BytesIO
+
+import numpy as np
+
+SR = 22050
+
+
+def tone(frequency=220.0, duration=5.0, sr=SR, amplitude=0.3):
+    t = np.arange(int(duration * sr)) / sr
+    return (amplitude * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+
+
+def chirp(f_start=50.0, f_end=8000.0, duration=5.0, sr=SR, amplitude=0.3):
+    """Exponential sweep from f_start to f_end."""
+    t = np.arange(int(duration * sr)) / sr
+    k = np.log(f_end / f_start) / duration
+    phase = 2 * np.pi * f_start * (np.exp(k * t) - 1) / k
+    return (amplitude * np.sin(phase)).astype(np.float32)
+
+
+def voiced_sentence(duration=4.0, sr=SR, seed=0):
+    """A speech-like signal: declining, wavy F0 with formant-shaped harmonics and pauses.
+
+    Voiced stretches alternate with short silences, roughly like the
+    syllables of a read sentence.
+    """
+    rng = np.random.default_rng(seed)
+    n = int(duration * sr)
+    t = np.arange(n) / sr
+    f0 = 140 - 30 * t / duration + 15 * np.sin(2 * np.pi * 1.5 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / sr
+    # Harmonics weighted by two formant peaks
+    signal = np.zeros(n)
+    for k in range(1, 30):
+        fk = k * f0
+        gain = np.exp(-((fk - 600) / 150) ** 2) + 0.6 * np.exp(-((fk - 1500) / 200) ** 2) + 0.05 / k
+        signal += gain * np.sin(k * phase)
+    # Syllable envelope with pauses
+    envelope = (np.sin(2 * np.pi * 2.5 * t) > -0.3).astype(float)
+    envelope = np.convolve(envelope, np.hanning(441) / np.hanning(441).sum(), mode="same")
+    signal = signal * envelope + 0.002 * rng.standard_normal(n)
+    return (0.3 * signal / np.max(np.abs(signal))).astype(np.float32)
+
+
+def long_recording(minutes=5.0, sr=SR):
+    """Several minutes of repeated voiced sentences."""
+    sentence = voiced_sentence(sr=sr)
+    repeats = int(np.ceil(minutes * 60 * sr / len(sentence)))
+    return np.tile(sentence, repeats)[:int(minutes * 60 * sr)]
+
+
+def wav_bytes(y, sr=SR):
+    import soundfile as sf
+
+    buffer = BytesIO()
+    sf.write(buffer, y, sr, format="WAV", subtype="PCM_16")
+    return buffer.getvalue()
+
+
+def mp3_bytes(y, sr=SR):
+    """Encode with ffmpeg; returns None when no ffmpeg is available."""
+    from utils.audio_io import ffmpeg_exe
+
+    exe = ffmpeg_exe()
+    if exe is None:
+        return None
+    result = subprocess.run([exe, "-loglevel", "error", "-i", "pipe:0", "-f", "mp3", "pipe:1"],
+                            input=wav_bytes(y, sr), capture_output=True, check=True)
+    return result.stdout
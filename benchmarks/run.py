@@ -0,0 +1,245 @@
+"""Benchmarks for the app's hot paths, with baseline comparison.
+
+Usage:
+    python benchmarks/run.py                    # run and compare with the baseline
+    python benchmarks/run.py --save-baseline    # run and store results as the new baseline
+    python benchmarks/run.py -k pitch           # only benchmarks whose name contains "pitch"
+
+Results are medians of several repetitions. A benchmark whose median is
+more than --threshold (default 20%) slower than the baseline is reported
+as a regression and the script exits with status 1. Baselines are
+machine-specific; save one on the machine you compare on.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import fixtures  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+BENCHMARKS = {}
+
+
+def benchmark(name, repeat=5):
+    """Register a benchmark. The function returns a zero-argument callable to time."""
+    def register(setup):
+        BENCHMARKS[name] = (setup, repeat)
+        return setup
+    return register
+
+
+def _unique_key():
+    # A fresh cache key for every run, so memoized paths are timed cold
+    return f"bench-{time.perf_counter_ns()}"
+
+
+@benchmark("spectrogram_stft_30s")
+def bench_spectrogram_stft():
+    from utils.spectrogram import SpectrogramEngine
+
+    y = fixtures.voiced_sentence(duration=30.0)
+    return lambda: SpectrogramEngine(y, fixtures.SR)
+
+
+@benchmark("spectrogram_view_and_render_png", repeat=10)
+def bench_spectrogram_render_png():
+    from utils.render import render_spectrogram_png
+    from utils.spectrogram import SpectrogramEngine
+
+    engine = SpectrogramEngine(fixtures.voiced_sentence(duration=30.0), fixtures.SR)
+
+    def run():
+        view = engine.view(2.0, 12.0, 0, 8000)
+        render_spectrogram_png(view.S_dB, view.times, view.freqs)
+    return run
+
+
+@benchmark("spectrogram_view_and_render_heatmap", repeat=10)
+def bench_spectrogram_render_heatmap():
+    from utils.render import spectrogram_heatmap
+    from utils.spectrogram import SpectrogramEngine
+
+    engine = SpectrogramEngine(fixtures.voiced_sentence(duration=30.0), fixtures.SR)
+
+    def run():
+        view = engine.view(2.0, 12.0, 0, 8000)
+        spectrogram_heatmap(view.S_dB, view.times, view.freqs).to_json()
+    return run
+
+
+@benchmark("spectrogram_window_10s_of_10min", repeat=10)
+def bench_spectrogram_window():
+    from utils.spectrogram import window_view
+    from utils.windowed import WindowedReader
+
+    reader = WindowedReader(fixtures.wav_bytes(fixtures.long_recording(minutes=10.0)))
+    return lambda: window_view(reader, 300.0, 310.0, 0, 8000)
+
+
+@benchmark("pitch_pyin_sentence", repeat=3)
+def bench_pitch_pyin():
+    from utils.pitch import estimate_f0
+
+    y = fixtures.voiced_sentence()
+    return lambda: estimate_f0(_unique_key(), y, fixtures.SR, engine="accurate")
+
+
+@benchmark("pitch_fast_sentence", repeat=10)
+def bench_pitch_fast():
+    from utils.pitch import estimate_f0
+
+    y = fixtures.voiced_sentence()
+    return lambda: estimate_f0(_unique_key(), y, fixtures.SR, engine="fast")
+
+
+@benchmark("pitch_stream_5min", repeat=3)
+def bench_pitch_stream():
+    from utils.pitch import stream_f0
+
+    data = fixtures.wav_bytes(fixtures.long_recording(minutes=5.0))
+    return lambda: sum(len(part.f0) for part in stream_f0(BytesIO(data)))
+
+
+@benchmark("formants_batch_200", repeat=3)
+def bench_formants_batch():
+    from utils.formants import analyze_vowels
+
+    files = [(f"token{i}", fixtures.wav_bytes(fixtures.voiced_sentence(duration=0.4, seed=i))) for i in range(200)]
+    return lambda: analyze_vowels(files)
+
+
+@benchmark("generate_tone_5s", repeat=10)
+def bench_generate_tone():
+    from utils.synthesis import generate_tone
+
+    return lambda: generate_tone(440, duration=5.0)
+
+
+@benchmark("speed_adjust_30s", repeat=5)
+def bench_speed_adjust():
+    from utils.time_stretch import time_stretch
+
+    y = fixtures.voiced_sentence(duration=30.0)
+    return lambda: time_stretch(y, 0.7)
+
+
+@benchmark("convert_to_wav_60s_mp3", repeat=5)
+def bench_convert_to_wav():
+    from utils.audio_io import convert_to_wav
+
+    data = fixtures.mp3_bytes(fixtures.long_recording(minutes=1.0))
+    if data is None:
+        return None
+    return lambda: convert_to_wav(BytesIO(data))
+
+
+@benchmark("tts_lookup_stub", repeat=20)
+def bench_tts_lookup():
+    from utils.tts_cache import TTSCache
+
+    wav = fixtures.wav_bytes(fixtures.tone(duration=0.5))
+    cache = TTSCache(tempfile.mkdtemp(prefix="bench-tts-"), synthesizer=lambda text, lang, tld: wav)
+    words = [f"word{i}" for i in range(50)]
+
+    def run():
+        for word in words:  # First run fills the cache; the rest are hits
+            cache.get(word, "en")
+    return run
+
+
+@benchmark("pronunciation_scoring_100", repeat=5)
+def bench_pronunciation_scoring():
+    from utils.audio_cache import content_hash
+    from utils.grading import OfflineRecognizer, grade_batch
+
+    sentence = "A stitch in time saves nine."
+    recordings = [fixtures.wav_bytes(fixtures.tone(frequency=100 + i, duration=1.0)) for i in range(100)]
+    recognizer = OfflineRecognizer({content_hash(r): "a stitch in time saves line" for r in recordings})
+    submissions = [(f"student{i}", sentence, r) for i, r in enumerate(recordings)]
+
+    def run():
+        recognizer.name = _unique_key()  # Bypass the transcript cache
+        grade_batch(submissions, recognizer)
+    return run
+
+
+@benchmark("intonation_dtw_100", repeat=5)
+def bench_intonation_dtw():
+    from utils.intonation import contour_from_audio, intonation_score
+
+    reference = contour_from_audio(fixtures.voiced_sentence(duration=4.0), fixtures.SR)
+    contours = [contour_from_audio(fixtures.voiced_sentence(duration=3.0 + i % 3, seed=i), fixtures.SR)
+                for i in range(100)]
+    return lambda: [intonation_score(contour, reference) for contour in contours]
+
+
+def run_benchmarks(selected):
+    results = {}
+    for name, (setup, repeat) in BENCHMARKS.items():
+        if selected and not any(s in name for s in selected):
+            continue
+        fn = setup()
+        if fn is None:
+            print(f"{name:40s} skipped")
+            continue
+        fn()  # Warm-up: imports, JIT compilation, page cache
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+        results[name] = {"median_s": statistics.median(times), "min_s": min(times), "repeat": repeat}
+    return results
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        line = f"{name:40s} {result['median_s'] * 1000:10.2f} ms"
+        if base:
+            change = result["median_s"] / base["median_s"] - 1
+            line += f"  ({change:+.0%} vs baseline)"
+            if change > threshold:
+                line += "  REGRESSION"
+                regressions.append(name)
+        print(line)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-k", action="append", default=[], help="Only run benchmarks whose name contains this")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown before flagging (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.k)
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+
+    if args.save_baseline:
+        baseline.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"Saved baseline to {args.baseline}")
+    elif regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Cold-start benchmark: time to run each page once in a fresh interpreter.
+
+Usage:
+    python benchmarks/startup.py [--runs 3] [--output startup.json]
+
+Each run starts a new Python process, imports Streamlit, then executes one
+page with Streamlit's AppTest. The Streamlit import is timed separately so
+the reported page cost is what the page itself adds. Heavy libraries the
+page imported (beyond those Streamlit had already loaded) are listed.
+"""
+import argparse
+import glob
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ["librosa", "matplotlib", "plotly", "scipy", "speech_recognition",
+                 "pandas", "soundfile", "gtts", "Levenshtein", "PIL", "pyarrow"]
+
+_CHILD = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+t0 = time.perf_counter()
+import streamlit
+from streamlit.testing.v1 import AppTest
+t1 = time.perf_counter()
+before = set(sys.modules)
+at = AppTest.from_file({page!r}, default_timeout=120).run()
+t2 = time.perf_counter()
+print(json.dumps({{
+    "streamlit_s": t1 - t0,
+    "page_s": t2 - t1,
+    "error": str(at.exception[0].message) if at.exception else "",
+    "loaded": [m for m in {heavy!r} if m in sys.modules and m not in before],
+}}))
+"""
+
+
+def run_page(page):
+    code = _CHILD.format(root=ROOT, page=page, heavy=HEAVY_MODULES)
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3, help="Fresh processes per page")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    pages = [os.path.join(ROOT, "Home.py")] + sorted(glob.glob(os.path.join(ROOT, "pages", "*.py")))
+    results = {}
+    for page in pages:
+        runs = [run_page(page) for _ in range(args.runs)]
+        name = os.path.basename(page)
+        results[name] = {
+            "page_s": statistics.median(r["page_s"] for r in runs),
+            "streamlit_s": statistics.median(r["streamlit_s"] for r in runs),
+            "loaded": runs[-1]["loaded"],
+            "error": runs[-1]["error"],
+        }
+        r = results[name]
+        print(f"{r['page_s']:7.3f}s  {name}  [{', '.join(r['loaded'])}]{'  ERROR: ' + r['error'] if r['error'] else ''}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,10 @@
 import streamlit as st
-from pydub import AudioSegment
-import io
-from gtts import gTTS  # Google Text-to-Speech
-import tempfile
-
-# Convert MP3 to WAV function
-def convert_to_wav(audio_file):
-    try:
-        sound = AudioSegment.from_mp3(audio_file)
-        buffer = io.BytesIO()
-        sound.export(buffer, format="wav")
-        buffer.seek(0)
-        return buffer
-    except Exception as e:
-        st.error(f"An error occurred: {str(e)}. This format may require external dependencies not available in this environment.")
+from utils.audio_asset import get_asset
+from utils.audio_io import convert_many_to_zip, convert_to_wav
+from utils.jobs import run_job
+from utils.metrics import debug_panel
+from utils.time_stretch import stretched_wav
+from utils.tts_cache import get_tts_cache
 
 def text_to_speech(text, language):
     lang_code = {
@@ -30,14 +21,8 @@ def text_to_speech(text, language):
         lang = lang_code[language]["lang"]
         tld = lang_code[language]["tld"]
 
-        if tld:
-            tts = gTTS(text=text, lang=lang, tld=tld)
-        else:
-            tts = gTTS(text=text, lang=lang)
-
-        temp_file = tempfile.NamedTemporaryFile(delete=False)
-        tts.save(temp_file.name)
-        return temp_file.name
+        # Served from the shared on-disk cache; synthesized only the first time
+        return get_tts_cache().get(text, lang, tld)
     except Exception as e:
         st.error(f"An error occurred: {str(e)}")
         return None
@@ -46,6 +31,7 @@ def text_to_speech(text, language):
 # Phonetics Apps Page
 def phonetics_apps_page():
     st.title('🐾 Play sound Apps')
+    debug_panel()
     st.write('Applications used to teach Phonetics.')
     st.markdown("""
     Here is a selection of audio-related applications specifically designed to enhance phonetics learning. These tools cater to various needs, such as playing audio files, converting file formats, and utilizing Text-to-Speech technology. They offer interactive exercises to improve pronunciation, develop listening skills, and heighten phonetic awareness, making them invaluable resources for learners and educators alike.
@@ -62,14 +48,11 @@ def phonetics_apps_page():
 
         if uploaded_file is not None:
             try:
-                sound = AudioSegment.from_file(uploaded_file, format='wav')
+                asset = get_asset(uploaded_file)
                 speed = st.slider("Adjust Speed", 0.5, 2.0, 1.0, step=0.1)
-                modified_sound = sound.speedup(playback_speed=speed)
-
-                buffer = io.BytesIO()
-                modified_sound.export(buffer, format="wav")
-                buffer.seek(0)
-                st.audio(buffer, format='audio/wav')
+                # Pitch-preserving stretch, memoized per file and speed
+                st.audio(run_job(lambda: stretched_wav(asset.key, asset.y, asset.sr, speed), label="Adjusting speed...",
+                                 job_key=("stretch", asset.key, speed)), format='audio/wav')
             except Exception as e:
                 st.error(f"An error occurred: {str(e)}")
                 st.error("Please ensure the file is a WAV format.")
@@ -77,12 +60,22 @@ def phonetics_apps_page():
     # Tab 2: MP3 to WAV Converter
     with tab2:
         st.header("MP3 to WAV Converter")
-        audio_file = st.file_uploader("Upload MP3 file", type=['mp3'])
+        audio_files = st.file_uploader("Upload MP3 file(s)", type=['mp3'], accept_multiple_files=True)
 
-        if audio_file is not None:
-            wav_buffer = convert_to_wav(audio_file)
-            if wav_buffer is not None:
-                st.audio(wav_buffer, format='audio/wav')
+        if len(audio_files) == 1:
+            try:
+                st.audio(convert_to_wav(audio_files[0]), format='audio/wav')
+            except Exception as e:
+                st.error(f"An error occurred: {str(e)}. This format may require external dependencies not available in this environment.")
+        elif len(audio_files) > 1:
+            # Convert several files in parallel and offer them as one zip
+            if st.button(f"Convert {len(audio_files)} files"):
+                archive, errors = run_job(convert_many_to_zip, [(f.name, f) for f in audio_files],
+                                          label=f"Converting {len(audio_files)} files...")
+                for name, error in errors.items():
+                    st.error(f"{name}: {error}")
+                st.download_button("Download WAV files (zip)", archive, file_name="converted_wav.zip",
+                                   mime="application/zip")
 
     # Tab 3: Multi-Text to Speech Application
     with tab3:
@@ -95,10 +88,9 @@ def phonetics_apps_page():
 
         if submit_button:
             if user_input:
-                audio_file_path = text_to_speech(user_input, language)
-                if audio_file_path:
-                    with open(audio_file_path, "rb") as audio_file:
-                        st.audio(audio_file, format='audio/mp3')
+                audio_bytes = text_to_speech(user_input, language)
+                if audio_bytes:
+                    st.audio(audio_bytes, format='audio/mp3')
     with tab4:
         st.header("Generate your own melody")
         st.caption("Using this app, the user can generate a downloadable audio file.")
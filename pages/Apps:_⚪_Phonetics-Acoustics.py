@@ -1,27 +1,26 @@
 import streamlit as st
 import numpy as np
-from scipy.io.wavfile import write
 from io import BytesIO
-import librosa
-import librosa.display
-import matplotlib.pyplot as plt
+import pandas as pd
 import plotly.graph_objects as go
-
-def generate_wave(amplitude, frequency, time):
-    """Generate sinusoidal wave data based on amplitude, frequency, and time."""
-    return amplitude * np.sin(2 * np.pi * frequency * time)
-
-def generate_tone(frequency, duration=1, sample_rate=44100, amplitude=0.3):
-    """Generate a pure tone based on the frequency."""
-    t = np.linspace(0, duration, int(sample_rate * duration), False)
-    tone = amplitude * np.sin(2 * np.pi * frequency * t)
-    tone_int16 = np.int16(tone / np.max(np.abs(tone)) * 32767)  # Convert to 16-bit data
-    return tone_int16, t, tone
-
-def plot_spectrogram(audio_path, time_min, time_max, freq_min, freq_max):
+from utils.audio_asset import get_asset
+from utils.audio_cache import to_wav_bytes
+from utils.downsample import decimated_scatter, zoom_slider
+from utils.jobs import run_job
+from utils.lazy import lazy_import
+from utils.metrics import debug_panel
+from utils.render import render_spectrogram_png, spectrogram_heatmap
+from utils.spectrogram import window_view
+from utils.synthesis import PRESETS, generate_tone, generate_wave, harmonic_preset, render_partials
+from utils.windowed import WINDOWED_THRESHOLD_SECONDS, WindowedReader
+
+# Loaded only when a tone is generated
+wavfile = lazy_import("scipy.io.wavfile")
+
+def plot_spectrogram(reader, asset, time_min, time_max, freq_min, freq_max, renderer='Interactive'):
     try:
-        y, sr = librosa.load(audio_path, sr=None)
-        if y.size == 0:
+        sr = reader.sr
+        if reader.frames == 0:
             st.error("Loaded audio is empty. Please check the file and try again.")
             return
         
@@ -31,34 +30,35 @@ def plot_spectrogram(audio_path, time_min, time_max, freq_min, freq_max):
         if start_sample >= end_sample:
             st.error("End time must be greater than start time.")
             return
-        if end_sample > len(y):
+        if end_sample > reader.frames:
             st.error("End time exceeds the audio duration.")
             return
         
-        y_segment = y[start_sample:end_sample]
+        # Only the selected window is decoded
+        y_segment, _ = reader.read(time_min, time_max)
 
         if y_segment.size == 0:
             st.error("Selected audio segment is empty.")
             return
 
-        D = np.abs(librosa.stft(y_segment))
-        S_dB = librosa.amplitude_to_db(D, ref=np.max)
-
-        plt.figure(figsize=(10, 4))
-        librosa.display.specshow(S_dB, sr=sr, x_axis='time', y_axis='linear', hop_length=512)
-        plt.colorbar(format='%+2.0f dB')
-        plt.title('Frequency Spectrogram in Hz')
-        plt.xlim([0, time_max - time_min])  # Adjust the x-axis to the duration of the segment
-        plt.ylim([freq_min, freq_max])
-        plt.xlabel('Time (s)')
-        plt.ylabel('Frequency (Hz)')
-        plt.tight_layout()
-        st.pyplot(plt)
-
-        buffer = BytesIO()
-        write(buffer, sr, y_segment.astype(np.int16))
-        buffer.seek(0)
-        st.audio(buffer, format='audio/wav')
+        if asset is not None:
+            # Short files: the STFT is computed once per file (on the shared pool); zooming only slices it
+            engine = run_job(asset.spectrogram, label="Computing spectrogram...", job_key=("spectrogram", asset.key))
+            view = engine.view(time_min, time_max, freq_min, freq_max)
+        else:
+            # Long files: only the window (plus STFT padding) is analysed
+            view = run_job(window_view, reader, time_min, time_max, freq_min, freq_max,
+                           label="Computing spectrogram...")
+
+        times = view.times - time_min  # Axis relative to the start of the segment
+        if renderer == 'Image':
+            png = render_spectrogram_png(view.S_dB, times, view.freqs)
+            st.image(png, caption=f'Frequency Spectrogram: {time_max - time_min:.1f} s, {freq_min}-{freq_max} Hz',
+                     use_container_width=True)
+        else:
+            st.plotly_chart(spectrogram_heatmap(view.S_dB, times, view.freqs), use_container_width=True)
+
+        st.audio(to_wav_bytes(y_segment, sr), format='audio/wav')
 
     except Exception as e:
         st.error(f"An error occurred while generating the spectrogram: {str(e)}")
@@ -66,6 +66,7 @@ def plot_spectrogram(audio_path, time_min, time_max, freq_min, freq_max):
 
 def main():
     st.title('Acoustics')
+    debug_panel()
     tabs = st.tabs(["Introduction", "Generate Tone", "Upload and Analyze Spectrogram","Complex wave"])
 
     with tabs[0]:
@@ -80,13 +81,18 @@ def main():
         if generate_button:
             data, t, waveform = generate_tone(freq_input, duration=duration_input)
             buffer = BytesIO()
-            write(buffer, 44100, data)
-            buffer.seek(0)
-            st.audio(buffer, format='audio/wav')
+            wavfile.write(buffer, 44100, data)
+            st.session_state['tone'] = (freq_input, buffer.getvalue(), t, waveform)
+
+        if 'tone' in st.session_state:
+            tone_freq, wav_bytes, t, waveform = st.session_state['tone']
+            st.audio(wav_bytes, format='audio/wav')
 
-            fig = go.Figure(data=go.Scatter(x=t, y=waveform))
+            # Only the zoomed window is sent, decimated to the screen width
+            window = zoom_slider('Zoom (s)', t[0], t[-1], key='tone_zoom')
+            fig = go.Figure(data=decimated_scatter(t, waveform, x_range=window))
             fig.update_layout(
-                title=f"Waveform of the Generated Tone at {freq_input} Hz",
+                title=f"Waveform of the Generated Tone at {tone_freq} Hz",
                 xaxis_title='Time [s]',
                 yaxis_title='Amplitude',
                 xaxis_rangeslider_visible=True
@@ -98,47 +104,75 @@ def main():
         uploaded_file = st.file_uploader("Upload your audio file (WAV format)", type=['wav'])
 
         if uploaded_file is not None:
-            audio_path = 'temp_audio.wav'
-            with open(audio_path, 'wb') as f:
-                f.write(uploaded_file.getbuffer())
+            try:
+                # Only the header is read here; samples are decoded per window
+                reader = WindowedReader(uploaded_file.getvalue())
+            except Exception as e:
+                st.error(f"Could not read the audio file: {str(e)}")
+                st.stop()
+            # Short recordings are decoded once per upload and reused across slider changes
+            asset = get_asset(uploaded_file) if reader.duration <= WINDOWED_THRESHOLD_SECONDS else None
             st.success("File uploaded successfully!")
-            st.audio(audio_path)  # Play the uploaded audio file immediately
-
-            time_min = st.slider('Start Time (s)', min_value=0.0, max_value=30.0, value=0.0, step=0.1)
-            time_max = st.slider('End Time (s)', min_value=0.1, max_value=30.0, value=5.0, step=0.1)
+            st.audio(uploaded_file.getvalue(), format='audio/wav')  # Play the uploaded audio file immediately
+
+            duration = float(np.floor(reader.duration * 10) / 10)
+            if duration <= 0.1:
+                # Too short for the 0.1 s slider steps; show the whole clip
+                time_min, time_max = 0.0, reader.duration
+                st.caption(f"The recording is {reader.duration:.2f} s long; the whole clip is shown.")
+            else:
+                time_min = st.slider('Start Time (s)', min_value=0.0, max_value=duration, value=0.0, step=0.1)
+                time_max = st.slider('End Time (s)', min_value=0.1, max_value=duration, value=min(5.0, duration), step=0.1)
             freq_min = st.slider('Min Frequency (Hz)', min_value=0, max_value=8000, value=0, step=100)
             freq_max = st.slider('Max Frequency (Hz)', min_value=1000, max_value=20000, value=8000, step=100)
+            renderer = st.radio('Display', ['Interactive', 'Image'], horizontal=True)
 
             if st.button('Generate Spectrogram'):
-                plot_spectrogram(audio_path, time_min, time_max, freq_min, freq_max)
+                plot_spectrogram(reader, asset, time_min, time_max, freq_min, freq_max, renderer)
 
     with tabs[3]:
         st.subheader("Generate a Complex Wave")
-        col1, col2 = st.columns(2)
-        amp1 = col1.number_input('Amplitude of Wave 1:', value=1.0, format="%.2f")
-        freq1 = col2.number_input('Frequency of Wave 1:', value=1.0, format="%.2f")
-        
-        amp2 = col1.number_input('Amplitude of Wave 2:', value=1.0, format="%.2f")
-        freq2 = col2.number_input('Frequency of Wave 2:', value=1.0, format="%.2f")
-        
-        amp3 = col1.number_input('Amplitude of Wave 3:', value=1.0, format="%.2f")
-        freq3 = col2.number_input('Frequency of Wave 3:', value=1.0, format="%.2f")
+        preset = st.selectbox("Partials", ["Custom"] + list(PRESETS))
+
+        if preset == "Custom":
+            st.caption("Edit the table to add, remove or change sine waves (partials).")
+            partials = st.data_editor(
+                pd.DataFrame({'Amplitude': [1.0, 1.0, 1.0], 'Frequency (Hz)': [1.0, 1.0, 1.0], 'Phase (rad)': [0.0, 0.0, 0.0]}),
+                num_rows="dynamic", use_container_width=True, key="partials").dropna()
+            amps = partials['Amplitude'].to_numpy(dtype=float)
+            freqs = partials['Frequency (Hz)'].to_numpy(dtype=float)
+            phases = partials['Phase (rad)'].to_numpy(dtype=float)
+        else:
+            col1, col2 = st.columns(2)
+            f0 = col1.number_input('Fundamental frequency (Hz):', min_value=20.0, max_value=2000.0, value=110.0)
+            n_partials = col2.slider('Number of harmonics:', min_value=1, max_value=500, value=40)
+            amps, freqs, phases = harmonic_preset(preset, f0, n_partials)
         
         t_max = st.slider("Select max time for the x-axis:", min_value=1, max_value=10, value=5, step=1)
         
         if st.button('Generate a complex wave'):
-            time = np.linspace(0, t_max, 1000)
-            wave1 = generate_wave(amp1, freq1, time)
-            wave2 = generate_wave(amp2, freq2, time)
-            wave3 = generate_wave(amp3, freq3, time)
-            complex_wave = wave1 + wave2 + wave3
-
-            # add dash='dash' for each if you want
+            if len(amps) == 0:
+                st.warning("Please add at least one partial.")
+            else:
+                st.session_state['complex_wave'] = (amps, freqs, phases, t_max)
+
+        if 'complex_wave' in st.session_state:
+            amps, freqs, phases, t_max = st.session_state['complex_wave']
+            # Rendered at audio rate and cached by parameters
+            wav_bytes, time, complex_wave = render_partials(amps, freqs, phases, t_max)
+            st.audio(wav_bytes, format='audio/wav')
+
+            window = zoom_slider("Zoom (s)", 0, t_max, key="complex_zoom")
             fig = go.Figure()
-            fig.add_trace(go.Scatter(x=time, y=wave1, mode='lines', name='Wave 1', line=dict(color='#f5c542')))
-            fig.add_trace(go.Scatter(x=time, y=wave2, mode='lines', name='Wave 2', line=dict(color='#69f542')))
-            fig.add_trace(go.Scatter(x=time, y=wave3, mode='lines', name='Wave 3', line=dict(color='#42d4f5')))  # 'light blue' should be 'lightblue'
-            fig.add_trace(go.Scatter(x=time, y=complex_wave, mode='lines', name='Complex Wave', line=dict(color='#4e535c', width=4)))
+            # Individual waves are drawn for small tables only
+            if len(amps) <= 5:
+                colors = ['#f5c542', '#69f542', '#42d4f5', '#f542b3', '#a142f5']
+                display_time = np.linspace(window[0], window[1], 1000)
+                for i, (amp, freq, phase) in enumerate(zip(amps, freqs, phases)):
+                    wave = generate_wave(amp, freq, display_time + phase / (2 * np.pi * freq) if freq else display_time)
+                    fig.add_trace(go.Scatter(x=display_time, y=wave, mode='lines', name=f'Wave {i + 1}', line=dict(color=colors[i])))
+            fig.add_trace(decimated_scatter(time, complex_wave, x_range=window, mode='lines', name='Complex Wave',
+                                            line=dict(color='#4e535c', width=4)))
 
 
             fig.update_layout(
@@ -1,47 +1,102 @@
 import streamlit as st
 import numpy as np
-import librosa
 import plotly.graph_objs as go
-from io import BytesIO
-import soundfile as sf
+from utils.audio_asset import get_asset
+from utils.audio_cache import content_hash
+from utils.downsample import decimated_scatter, zoom_slider
+from utils.jobs import run_job
+from utils.metrics import debug_panel
+from utils.pitch import (FMAX, FMIN, STREAM_THRESHOLD_SECONDS, analyze_batch, compare_tracks, estimate_f0,
+                         iter_wav_uploads, segment_f0, stream_track)
+from utils.session_memory import get_session_memory
+from utils.windowed import WindowedReader
 
 # Title of the app
 st.title("Your Voice Pitch")
+debug_panel()
 st.caption("Fundamental Frequency (F0) Estimation")
 st.write("Record the following sentence and upload the audio in wav format:")
 
 st.markdown("### '_Moments of meaning emerge when we listen to the sound of the heart._'")
 
-# Create two tabs: Upload and View Results
-tab1, tab2 = st.tabs(["Upload Audio", "View Results"])
+# Create tabs: Upload, View Results and Batch analysis for a whole class
+tab1, tab2, tab3 = st.tabs(["Upload Audio", "View Results", "Batch (class)"])
 
 # Step 1: Upload or record audio file
 with tab1:
     st.header("Upload an audio file")
     uploaded_file = st.file_uploader("Upload an audio file in .wav format", type=["wav"])
     
+    engine = st.radio("Pitch engine", ["fast", "accurate"], horizontal=True,
+                      help="fast: vectorized YIN on decimated audio; accurate: librosa pYIN (slow)")
+    
     if uploaded_file is not None:
-        # Save the uploaded file temporarily
-        temp_file_path = "temp_audio_file.wav"
-        with open(temp_file_path, "wb") as f:
-            f.write(uploaded_file.read())
-        
-        st.audio(temp_file_path, format="audio/wav")
+        st.audio(uploaded_file.getvalue(), format="audio/wav")
+        # A 16-bit copy of the audio is kept for this session (spilled to disk under memory pressure) so
+        # the engine comparison still works once the shared decode cache has evicted the float samples
+        memory = get_session_memory()
         
-        # Load audio data using librosa
         try:
-            audio_data, sr = librosa.load(temp_file_path, sr=None)  # Load without resampling
+            key = content_hash(uploaded_file.getvalue())
+            # Only the header is read here; samples are decoded per segment or block
+            reader = WindowedReader(uploaded_file.getvalue())
+            duration = reader.duration
+            segment = None
+            if duration > STREAM_THRESHOLD_SECONDS and st.checkbox("Analyze one segment only"):
+                segment = st.slider("Segment (s)", min_value=0.0, max_value=float(duration),
+                                    value=(0.0, min(30.0, float(duration))), step=0.5)
+            streaming = segment is None and st.checkbox(
+                "Streaming mode (for long recordings)", value=duration > STREAM_THRESHOLD_SECONDS,
+                help="Reads the file block by block with the fast engine; memory use stays constant.")
             
-            # Compute the fundamental frequency (F0)
-            fmin = 50  # Minimum expected frequency (e.g., typical human pitch range)
-            fmax = 300  # Maximum expected frequency
+            if segment is not None:
+                # Only the segment plus pitch-window context is decoded
+                track = run_job(segment_f0, reader, segment[0], segment[1], engine=engine, key=key, fmin=FMIN, fmax=FMAX,
+                                label="Tracking pitch...")
+                st.session_state['f0'] = track.f0
+                st.session_state['times'] = track.times
+                st.session_state['sr'] = reader.sr
+                for name in ('stream_key', 'audio_key'):
+                    st.session_state.pop(name, None)
+                memory.discard('audio_data')
+            elif streaming and st.session_state.get('stream_key') == key:
+                pass  # Contour of this file is already in session state
+            elif streaming:
+                # Track F0 block by block on the job pool and fill the contour in progressively
+                chart = st.empty()
 
-            f0, voiced_flag, voiced_probs = librosa.pyin(audio_data, fmin=fmin, fmax=fmax, sr=sr)
+                def show_partial(part):
+                    fig = go.Figure(decimated_scatter(part.times, part.f0, mode='lines', line=dict(color='red')))
+                    fig.update_layout(xaxis_range=[0, duration], yaxis_range=[0, 300], height=250,
+                                      margin=dict(t=20, b=20))
+                    chart.plotly_chart(fig, key=f"stream_chart_{len(part.times)}")
 
-            # Store F0 and other info in session state
-            st.session_state['f0'] = f0
-            st.session_state['sr'] = sr
-            st.session_state['audio_data'] = audio_data
+                track = run_job(stream_track, uploaded_file.getvalue(), fmin=FMIN, fmax=FMAX,
+                                label="Tracking pitch...", job_key=("f0_stream", key), on_partial=show_partial)
+                chart.empty()
+                st.session_state['f0'] = track.f0
+                st.session_state['times'] = track.times
+                st.session_state['sr'] = track.sr
+                st.session_state['stream_key'] = key
+                st.session_state.pop('audio_key', None)
+                memory.discard('audio_data')
+            else:
+                # Load audio data (decoded once per file)
+                asset = get_asset(uploaded_file)
+                audio_data, sr = asset.y, asset.sr
+                st.session_state.pop('stream_key', None)
+                
+                # Compute the fundamental frequency (F0), cached per file and engine
+                track = run_job(asset.f0, engine, fmin=FMIN, fmax=FMAX, label="Tracking pitch...",
+                                job_key=("f0", asset.key, engine))
+
+                # Store F0 and other info in session state
+                st.session_state['f0'] = track.f0
+                st.session_state['times'] = track.times
+                st.session_state['sr'] = sr
+                if st.session_state.get('audio_key') != asset.key or 'audio_data' not in memory:
+                    memory.put_audio('audio_data', audio_data)
+                st.session_state['audio_key'] = asset.key
             
         except Exception as e:
             st.error(f"An error occurred while processing the audio: {e}")
@@ -55,10 +110,13 @@ with tab2:
         sr = st.session_state['sr']
 
         # Prepare the plot using Plotly for interactivity
-        times = librosa.times_like(f0, sr=sr)
+        times = st.session_state['times']
         fig = go.Figure()
 
-        fig.add_trace(go.Scatter(x=times, y=f0, mode='lines', name='F0 (Fundamental Frequency)', line=dict(color='red')))
+        # Only the zoomed window is sent, decimated to the screen width
+        window = zoom_slider("Zoom (s)", times[0], times[-1], key="f0_zoom") if len(times) else None
+        fig.add_trace(decimated_scatter(times, f0, x_range=window, mode='lines', name='F0 (Fundamental Frequency)',
+                                        line=dict(color='red')))
         
         fig.update_layout(
             title="Fundamental Frequency (F0)",
@@ -77,5 +135,41 @@ with tab2:
             st.write(f"Approximate average fundamental frequency (F0): {avg_f0:.2f} Hz")
         else:
             st.write("F0 could not be estimated from the audio.")
+
+        # Accuracy of the fast engine measured against pYIN on this recording
+        if 'audio_key' in st.session_state and st.button("Compare fast and accurate engines"):
+            key = st.session_state['audio_key']
+            audio_data = get_session_memory().get('audio_data')
+            if audio_data is None:
+                st.warning("The recording is no longer held for this session. Please upload it again.")
+            else:
+                fast = run_job(estimate_f0, key, audio_data, sr, engine="fast", label="Running the fast engine...")
+                accurate = run_job(estimate_f0, key, audio_data, sr, engine="accurate", label="Running pYIN...",
+                                   job_key=("f0", key, "accurate"))
+                stats = compare_tracks(accurate, fast)
+                st.write(f"Voicing agreement: {stats['voicing_agreement']:.1%}")
+                st.write(f"Mean F0 difference: {stats['mean_abs_cents']:.1f} cents")
+                st.write(f"Frames off by more than 50 cents: {stats['gross_error_rate']:.1%}")
     else:
         st.write("No results to display. Please upload and process audio in the previous tab.")
+
+# Step 3: Batch analysis of many recordings
+with tab3:
+    st.header("Batch pitch analysis")
+    st.caption("Upload the class's recordings as WAV files or a zip archive. Each file name is used as the speaker name.")
+    batch_files = st.file_uploader("Upload WAV files or a zip", type=["wav", "zip"], accept_multiple_files=True)
+    batch_engine = st.radio("Pitch engine for the batch", ["fast", "accurate"], horizontal=True)
+
+    if st.button("Analyze batch"):
+        if batch_files:
+            files = list(iter_wav_uploads(batch_files))
+            st.session_state['batch_summary'] = run_job(analyze_batch, files, engine=batch_engine,
+                                                        label=f"Analyzing {len(files)} recordings...")
+        else:
+            st.warning("Please upload at least one WAV file or zip archive.")
+
+    if 'batch_summary' in st.session_state:
+        summary = st.session_state['batch_summary']
+        st.dataframe(summary.round(2), use_container_width=True)
+        st.download_button("Download CSV", summary.to_csv(index=False).encode("utf-8"),
+                           file_name="pitch_summary.csv", mime="text/csv")
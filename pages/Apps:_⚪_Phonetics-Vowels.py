@@ -1,7 +1,19 @@
 import streamlit as st
+import numpy as np
+from utils.audio_asset import get_asset
+from utils.formants import analyze_vowels, vowel_chart, vowel_formants
+from utils.jobs import run_job
+from utils.lazy import lazy_import
+from utils.metrics import debug_panel
+from utils.pitch import iter_wav_uploads
+
+# Loaded only once a vowel is analysed
+pd = lazy_import("pandas")
+go = lazy_import("plotly.graph_objects")
 
 # Title of the application
 st.title("🍃 Phonetics Learning Tools")
+debug_panel()
 
 # Create two tabs: 'Vowel Chart' and 'V-description app'
 tab1, tab2, tab3 = st.tabs(["Vowel Chart", "V-description app", "Audio & stressed vowels"])
@@ -9,13 +21,60 @@ tab1, tab2, tab3 = st.tabs(["Vowel Chart", "V-description app", "Audio & stresse
 # Define the content of each tab
 with tab1:
     st.header("Vowel Chart with Formants (F1 and F2)")
-    st.markdown("This tool provides a vowel chart for phonetics practice.")
-    
-    # Create a link styled as a button that opens the URL in a new tab
-    vowel_chart_url = "https://vowelchart.streamlit.app"
-    st.markdown(f'<a href="{vowel_chart_url}" target="_blank" style="display: inline-block; text-decoration: none; background-color: #FF9933; color: white; padding: 10px 20px; border-radius: 5px;">Open Vowel Charting App</a>', unsafe_allow_html=True)
+    st.markdown("Upload a recording of a single vowel to measure its formants, or a whole set of vowel tokens to chart them together.")
+
+    mode = st.radio("Input", ["Single vowel", "Batch (folder or zip)"], horizontal=True)
 
-    st.caption("This tool provides a vowel chart based on formants (F1, F2).")
+    if mode == "Single vowel":
+        vowel_file = st.file_uploader("Upload a vowel recording (WAV format)", type=["wav"], key="vowel_file")
+        if vowel_file is not None:
+            st.audio(vowel_file.getvalue(), format="audio/wav")
+            try:
+                # Formants are computed once per file and reused on reruns
+                asset = get_asset(vowel_file)
+                track = run_job(asset.formants, label="Measuring formants...", job_key=("formants", asset.key))
+            except Exception as e:
+                st.error(f"Could not analyze the audio file: {str(e)}")
+                st.stop()
+            f1, f2, f3 = vowel_formants(track.formants)
+            if np.isnan(f1):
+                st.warning("No voiced frames were found in the recording.")
+            else:
+                col1, col2, col3 = st.columns(3)
+                col1.metric("F1", f"{f1:.0f} Hz")
+                col2.metric("F2", f"{f2:.0f} Hz")
+                col3.metric("F3", f"{f3:.0f} Hz")
+                st.plotly_chart(vowel_chart(pd.DataFrame({"token": [vowel_file.name], "F1": [f1], "F2": [f2]})),
+                                use_container_width=True)
+
+                fig = go.Figure()
+                for i, color in enumerate(['#FF9933', '#006666', '#99CCFF']):
+                    fig.add_trace(go.Scatter(x=track.times, y=track.formants[:, i], mode='markers',
+                                             marker=dict(size=4, color=color), name=f'F{i + 1}'))
+                fig.update_layout(title="Formant track", xaxis_title="Time (s)", yaxis_title="Frequency (Hz)")
+                st.plotly_chart(fig, use_container_width=True)
+    else:
+        st.caption("Upload vowel tokens as WAV files or a zip archive. Each file name is used as the token label.")
+        vowel_files = st.file_uploader("Upload WAV files or a zip", type=["wav", "zip"], accept_multiple_files=True,
+                                       key="vowel_batch")
+        if st.button("Analyze vowels"):
+            if vowel_files:
+                files = list(iter_wav_uploads(vowel_files))
+                st.session_state['vowel_table'] = run_job(analyze_vowels, files,
+                                                          label=f"Analyzing {len(files)} vowel tokens...")
+            else:
+                st.warning("Please upload at least one WAV file or zip archive.")
+
+        if 'vowel_table' in st.session_state:
+            table = st.session_state['vowel_table']
+            st.plotly_chart(vowel_chart(table.dropna(subset=["F1", "F2"])), use_container_width=True)
+            st.dataframe(table.round(1), use_container_width=True)
+            st.download_button("Download CSV", table.to_csv(index=False).encode("utf-8"),
+                               file_name="vowel_formants.csv", mime="text/csv")
+
+    # The external charting app is kept for its reference vowel plots
+    vowel_chart_url = "https://vowelchart.streamlit.app"
+    st.caption(f"This tool provides a vowel chart based on formants (F1, F2). See also the [Vowel Charting App]({vowel_chart_url}).")
 
 with tab2:
     st.header("Vowel description application 1")
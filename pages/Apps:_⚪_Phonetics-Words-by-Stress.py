@@ -1,18 +1,34 @@
 import streamlit as st
-import pandas as pd
-import tempfile
-from gtts import gTTS
+from utils.dataset import load_stress_data
+from utils.audio_pack import load_audio_pack
+from utils.metrics import debug_panel
+from utils.tts_cache import get_tts_cache
+from utils.word_index import WordIndex
 
 # Set page configuration for wider layout
 st.set_page_config(layout="wide")
+debug_panel()
 
-# Load the dataset from GitHub
+# Load the dataset from its local snapshot (refreshed from GitHub when stale)
 @st.cache_data
-def load_data(url):
-    return pd.read_csv(url)
+def load_data():
+    return load_stress_data(columns=['Word', 'POS', 'Stress', 'Transcription', 'Variation'])
 
-csv_url = "https://raw.githubusercontent.com/MK316/stress2024/refs/heads/main/data/data20241216.csv"
-df = load_data(csv_url)
+df = load_data()
+
+# Pre-synthesized word audio (built with scripts/build_audio_pack.py), memory-mapped once
+@st.cache_resource
+def get_audio_pack():
+    return load_audio_pack()
+
+audio_pack = get_audio_pack()
+
+# Stress slices and search indexes, built once per process
+@st.cache_resource
+def get_word_index():
+    return WordIndex(load_data())
+
+word_index = get_word_index()
 
 # POS mapping
 pos_mapping = {
@@ -40,10 +56,6 @@ def add_stress_circles(stress):
     circle_html += "</div>"
     return circle_html
 
-# Initialize session state for button click
-if 'button_clicked' not in st.session_state:
-    st.session_state.button_clicked = False
-
 # Main app layout
 st.markdown("### ⛄ 1. Words-by-stress")
 st.caption("Chapter 7. Stress; A total of 564 words")
@@ -54,28 +66,25 @@ selected_stress = st.selectbox("🔴 Select Stress Position", ["1st", "2nd", "an
 if selected_stress:
     st.markdown(add_stress_circles(selected_stress), unsafe_allow_html=True)
 
-    # Display data based on selected stress
-    filtered_data = df[df['Stress'] == selected_stress]
+    # Display data based on selected stress (a precomputed slice, no filtering)
+    filtered_data = word_index.by_stress(selected_stress)
     st.write("")
     st.write(f"🌱 Total words with '{selected_stress}' stress: {len(filtered_data)}")
     st.dataframe(filtered_data[['Word', 'POS', 'Transcription', 'Variation']], width=600, height=200)
 
 # Word Search with Audio Playback
 st.markdown("### ❄️ 2. Word details with Audio")
-user_input = st.text_input("🔴 Enter the number next to a word to search (e.g., 104 for 'category'):", placeholder="Type a word here...")
-
-# Manage button click state
-def on_search():
-    st.session_state.button_clicked = True
-
-search_button = st.button("Search", on_click=on_search)
-
-if search_button or st.session_state.button_clicked:
-    try:
-        # Convert user input to integer index
-        index = int(user_input)
-        # Access the DataFrame by index
-        row = df.iloc[index]
+user_input = st.text_input("🔴 Enter a word, part of a word or IPA, or the number next to a word (e.g., 104 for 'category'):",
+                           placeholder="Type a word here...")
+
+if user_input:
+    matches = word_index.search(user_input)
+    if not matches:
+        st.error("No matching words. Try another spelling or an IPA fragment.")
+    else:
+        index = st.radio("Matches", matches, horizontal=True,
+                         format_func=lambda i: f"{i}: {df.loc[i, 'Word']} [{df.loc[i, 'Transcription']}]")
+        row = df.loc[index]
         
         pos = row['POS']
         full_pos = convert_pos(pos)
@@ -84,19 +93,17 @@ if search_button or st.session_state.button_clicked:
         word = row['Word']
         variation = row.get('Variation', 'N/A')  # Assuming 'Variation' might not exist
 
-        tts = gTTS(text=word, lang='en')
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".mp3")
-        tts.save(temp_file.name)
-
         st.write(f"POS: {full_pos}")
         st.write(f"Stress: {stress}")
         st.write(f"IPA: {transcription}")
         st.write(f"Variation: {variation}")
-        st.audio(temp_file.name)
-
-    except ValueError:
-        st.error("Please enter a valid integer index.")
-    except IndexError:
-        st.error("Index out of range. Please enter a valid index.")
-    finally:
-        st.session_state.button_clicked = False  # Reset state after the search attempt
+
+        # Play from the audio pack; synthesize only words missing from it
+        try:
+            if audio_pack is not None and word in audio_pack:
+                audio_bytes = audio_pack.get(word)
+            else:
+                audio_bytes = get_tts_cache().get(word, 'en')
+            st.audio(audio_bytes, format='audio/mp3')
+        except Exception as e:
+            st.error(f"Audio is not available right now: {str(e)}")
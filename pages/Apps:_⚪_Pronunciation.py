@@ -1,83 +1,67 @@
 import streamlit as st
-import speech_recognition as sr
-from Levenshtein import ratio
-import tempfile
-import numpy as np
 import pandas as pd
+from utils.audio_io import convert_to_wav
+from utils.audio_asset import get_asset
+from utils.intonation import contour_from_audio, intonation_score, reference_contour, score_batch
+from utils.jobs import run_job
+from utils.lazy import lazy_import
+from utils.metrics import debug_panel
+from utils.grading import (PRACTICE_SENTENCES, GoogleRecognizer, feedback_for, grade_batch,
+                           parse_submission_name, transcribe)
+from utils.pitch import iter_wav_uploads
+from utils.score_store import get_score_store
+
+# Loaded only when a recording is checked
+sr = lazy_import("speech_recognition")
+Levenshtein = lazy_import("Levenshtein")
+go = lazy_import("plotly.graph_objects")
 
 # Sample dataframe with sentences
 data = {
-    "Sentences": [
-        "A stitch in time saves nine.",
-        "To be or not to be, that is the question.",
-        "Five cats were living in safe caves.",
-        "Hives give shelter to bees in large caves.",
-        "His decision to plant a rose was amazing.",
-        "She sells sea shells by the sea shore.",
-        "The colorful parrot likes rolling berries.",
-        "Time flies like an arrow; fruit flies like a banana.",
-        "Good things come to those who wait.",
-        "All human beings are born free and equal in dignity and rights."
-    ]
+    "Sentences": PRACTICE_SENTENCES
 }
 df = pd.DataFrame(data)
-user_scores = {}
 
-# Function to transcribe audio
-def transcribe_audio(file_path):
-    r = sr.Recognizer()
-    with sr.AudioFile(file_path) as source:
-        audio_data = r.record(source)
+# Scores persist across reloads and are shared safely between sessions
+score_store = get_score_store()
+
+# Function to transcribe audio (cached by audio hash, shared with batch grading)
+def transcribe_audio(asset):
     try:
-        text = r.recognize_google(audio_data)
-        return text
-    except sr.UnknownValueError:
-        return "Could not understand audio"
+        text = run_job(transcribe, GoogleRecognizer(), asset.pcm16, asset.key, label="Recognizing speech...",
+                       job_key=("transcribe", asset.key))
+        return text or "Could not understand audio"
     except sr.RequestError as e:
         return f"Could not request results; {e}"
 
 # Function to calculate pronunciation correction
-def pronunciation_correction(name, expected_text, audio_file):
-    user_spoken_text = transcribe_audio(audio_file)
-    similarity = ratio(expected_text.lower(), user_spoken_text.lower())
+def pronunciation_correction(name, expected_text, asset):
+    user_spoken_text = transcribe_audio(asset)
+    similarity = Levenshtein.ratio(expected_text.lower(), user_spoken_text.lower())
     score = float(f"{similarity:.2f}")
     
-    if name in user_scores:
-        user_scores[name].append(score)
-    else:
-        user_scores[name] = [score]
+    score_store.add(name, score, sentence=expected_text)
     
-    feedback = "Excellent pronunciation!" if score >= 0.9 else \
-               "Good pronunciation!" if score >= 0.7 else \
-               "Needs improvement." if score >= 0.5 else \
-               "Maybe you said something different? Try again focusing more on clarity."
+    feedback = feedback_for(score)
     return feedback, score
 
+# Function to compare the intonation of a recording with the sentence's reference contour
+def intonation_feedback(expected_text, asset):
+    contour = contour_from_audio(asset.y, asset.sr)
+    reference = reference_contour(expected_text)
+    return intonation_score(contour, reference), contour, reference
+
 # Function to calculate average score
 def calculate_average(name):
-    if name in user_scores and user_scores[name]:
-        filtered_scores = [score for score in user_scores[name] if score > 0]  # Ignore zeros
-        average_score = sum(filtered_scores) / len(filtered_scores)
-    else:
-        average_score = 0
+    average_score = score_store.average(name)  # Running aggregate; zeros are ignored
     return f"Great job, {name}! Your average score is: {average_score:.2f}. Keep practicing to improve further!"
 
-# Convert MP3 to WAV function
-def convert_to_wav(audio_file):
-    try:
-        sound = AudioSegment.from_mp3(audio_file)
-        buffer = io.BytesIO()
-        sound.export(buffer, format="wav")
-        buffer.seek(0)
-        return buffer
-    except Exception as e:
-        st.error(f"An error occurred: {str(e)}. This format may require external dependencies not available in this environment.")
-        
 # Streamlit app layout
 st.title("Pronunciation Feedback")
+debug_panel()
 
 # Tabs
-tab1, tab2, tab3, tab4 = st.tabs(["🎵 Recording", "🎶 MP3-to-WAV", "🌀 Accuracy Feedback", "Temporary"])
+tab1, tab2, tab3, tab4, tab5 = st.tabs(["🎵 Recording", "🎶 MP3-to-WAV", "🌀 Accuracy Feedback", "Temporary", "📋 Batch Grading"])
 
 
 # Tab 1: Recording
@@ -95,9 +79,10 @@ with tab2:
     audio_file = st.file_uploader("Upload MP3 file", type=['mp3'])
 
     if audio_file is not None:
-        wav_buffer = convert_to_wav(audio_file)
-        if wav_buffer is not None:
-             st.audio(wav_buffer, format='audio/wav')
+        try:
+            st.audio(convert_to_wav(audio_file), format='audio/wav')
+        except Exception as e:
+            st.error(f"An error occurred: {str(e)}. This format may require external dependencies not available in this environment.")
 
 # Tab 3: Accuracy Feedback
 with tab3:
@@ -122,12 +107,32 @@ with tab4:
     # Button to check pronunciation
     if st.button("Check Pronunciation"):
         if name and audio_file and sentence:
-            with tempfile.NamedTemporaryFile(delete=True, suffix=".wav") as tmpfile:
-                tmpfile.write(audio_file.read())
-                tmpfile.seek(0)
-                feedback, score = pronunciation_correction(name, sentence, tmpfile.name)
-                st.write("Pronunciation Feedback:", feedback)
-                st.write("Pronunciation Accuracy Score:", score)
+            asset = get_asset(audio_file)
+            feedback, score = pronunciation_correction(name, sentence, asset)
+            st.write("Pronunciation Feedback:", feedback)
+            st.write("Pronunciation Accuracy Score:", score)
+
+            # Intonation: the recording's pitch contour aligned to the sentence's reference contour
+            try:
+                tone_score, contour, reference = run_job(intonation_feedback, sentence, asset,
+                                                         label="Comparing intonation...")
+            except Exception as e:
+                st.warning(f"Intonation could not be compared: {e}")
+            else:
+                if len(contour.pitch) < 2 or contour.times[-1] <= 0:
+                    st.write("Intonation could not be measured; no voiced speech was found.")
+                elif len(reference.pitch) < 2 or reference.times[-1] <= 0:
+                    st.write("Intonation could not be compared; no reference contour is available for this sentence.")
+                else:
+                    st.write("Intonation Similarity Score:", round(tone_score, 2))
+                    fig = go.Figure()
+                    fig.add_trace(go.Scatter(x=reference.times / reference.times[-1], y=reference.pitch,
+                                             mode='lines', name='Reference', line=dict(color='#4CAF50')))
+                    fig.add_trace(go.Scatter(x=contour.times / contour.times[-1], y=contour.pitch,
+                                             mode='lines', name='Your recording', line=dict(color='red')))
+                    fig.update_layout(title="Pitch contour", xaxis_title="Relative time",
+                                      yaxis_title="Pitch (semitones from your median)")
+                    st.plotly_chart(fig, use_container_width=True)
         else:
             st.warning("Please enter your name, select a sentence, and upload an audio file.")
     
@@ -138,3 +143,28 @@ with tab4:
             st.write(avg_score)
         else:
             st.warning("Please enter your name to calculate the average score.")
+
+
+with tab5:
+    st.subheader("Grade a class's recordings")
+    st.caption("Upload WAV files or a zip archive. Name each file '<student>_<n>.wav' to grade it against sentence n (1-10); other files are graded against the sentence selected below. Intonation is scored against a reference contour of each sentence.")
+    batch_sentence = st.selectbox("Default sentence", df['Sentences'].tolist(), key="batch_sentence")
+    batch_files = st.file_uploader("Upload WAV files or a zip", type=["wav", "zip"], accept_multiple_files=True, key="batch_files")
+
+    if st.button("Grade all"):
+        if batch_files:
+            sentences = df['Sentences'].tolist()
+            submissions = [(*parse_submission_name(name, sentences, batch_sentence), wav)
+                           for name, wav in iter_wav_uploads(batch_files)]
+            grades = run_job(grade_batch, submissions, GoogleRecognizer(), label=f"Grading {len(submissions)} recordings...")
+            grades['intonation'] = run_job(score_batch, submissions, label="Comparing intonation...")
+            st.session_state['batch_grades'] = grades
+        else:
+            st.warning("Please upload at least one WAV file or zip archive.")
+
+    if 'batch_grades' in st.session_state:
+        grades = st.session_state['batch_grades']
+        st.dataframe(grades, use_container_width=True)
+        st.write(f"Class average: {grades['score'].mean():.2f}")
+        st.download_button("Download CSV", grades.to_csv(index=False).encode("utf-8"),
+                           file_name="pronunciation_scores.csv", mime="text/csv")
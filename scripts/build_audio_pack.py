@@ -0,0 +1,40 @@
+"""Pre-synthesize every word of the stress dataset into one audio pack.
+
+Usage:
+    python scripts/build_audio_pack.py [--output data/stress_words.pack] [--workers 8]
+
+The Words-by-Stress page memory-maps the resulting pack and plays words
+from it, so no speech is synthesized while students are searching.
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.audio_pack import STRESS_AUDIO_PACK, build_audio_pack  # noqa: E402
+from utils.dataset import load_stress_data  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", default=STRESS_AUDIO_PACK, help="Pack file to write")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent synthesis requests")
+    parser.add_argument("--retries", type=int, default=4, help="Retries per word")
+    args = parser.parse_args()
+
+    words = load_stress_data(columns=["Word"])["Word"].dropna().astype(str).tolist()
+
+    def progress(done, total):
+        print(f"\r{done}/{total} words", end="", flush=True)
+
+    failed = build_audio_pack(words, args.output, max_workers=args.workers,
+                              retries=args.retries, progress=progress)
+    print(f"\nWrote {args.output}")
+    if failed:
+        print(f"{len(failed)} words failed: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
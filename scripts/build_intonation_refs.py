@@ -0,0 +1,29 @@
+"""Precompute reference pitch and intensity contours for the practice sentences.
+
+Usage:
+    python scripts/build_intonation_refs.py [--output data/intonation_refs.npz]
+
+Each sentence is synthesized (through the TTS cache) and its contour saved,
+so the Pronunciation page can score intonation without synthesizing speech.
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.grading import PRACTICE_SENTENCES  # noqa: E402
+from utils.intonation import REFERENCE_CONTOURS, build_reference_contours  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", default=REFERENCE_CONTOURS, help="Contour file to write")
+    args = parser.parse_args()
+
+    build_reference_contours(PRACTICE_SENTENCES, args.output)
+    print(f"Wrote {len(PRACTICE_SENTENCES)} contours to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
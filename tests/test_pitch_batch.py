@@ -0,0 +1,36 @@
+"""Batch pitch workers must not run the page that started them."""
+import sys
+import types
+from io import BytesIO
+
+import numpy as np
+import soundfile as sf
+
+from utils.pitch import analyze_batch
+
+
+def _wav(seconds=1.0, sr=16000, frequency=150.0):
+    t = np.arange(int(seconds * sr)) / sr
+    buffer = BytesIO()
+    sf.write(buffer, 0.3 * np.sin(2 * np.pi * frequency * t), sr, format="WAV")
+    return buffer.getvalue()
+
+
+def test_batch_workers_do_not_run_the_page(tmp_path):
+    marker = tmp_path / "page_ran"
+    page = tmp_path / "page.py"
+    page.write_text(f"open({str(marker)!r}, 'a').write(__name__ + '\\n')\n")
+
+    # Streamlit's ScriptRunner runs each page as a fresh __main__ module with __file__ set
+    main = sys.modules["__main__"]
+    fake_main = types.ModuleType("__main__")
+    fake_main.__file__ = str(page)
+    sys.modules["__main__"] = fake_main
+    try:
+        table = analyze_batch([("a", _wav()), ("b", _wav(frequency=200.0))], max_workers=2)
+    finally:
+        sys.modules["__main__"] = main
+
+    assert not marker.exists(), f"page ran as {marker.read_text().split()}"
+    assert list(table["error"]) == ["", ""]
+    assert np.allclose(table["median_f0"], [150.0, 200.0], rtol=0.02)
@@ -0,0 +1,91 @@
+"""AudioAsset: one uploaded recording with lazily computed, shared views."""
+from utils.audio_cache import LRUCache, content_hash, decode_audio, to_wav_bytes
+
+VIEW_CACHE_BYTES = 128 * 1024 * 1024
+
+# Derived views of all assets, keyed by (content hash, view, parameters)
+_views = LRUCache(VIEW_CACHE_BYTES, name="asset_views")
+
+
+class AudioAsset:
+    """Handle on an uploaded recording, identified by a hash of its bytes.
+
+    Nothing is decoded until a view is requested, and every view lives in a
+    process-wide cache keyed by the content hash. The same recording uploaded
+    on the Acoustics, Pitch and Pronunciation pages is therefore decoded and
+    analysed only once.
+    """
+
+    def __init__(self, data):
+        self.data = bytes(data)
+        self.key = content_hash(self.data)
+
+    def _view(self, name, params, compute):
+        return _views.get_or_compute((self.key, name, params), compute)
+
+    def _decoded(self):
+        _, y, sr = decode_audio(self.data, key=self.key)
+        return y, sr
+
+    @property
+    def y(self):
+        """Mono float samples at the native sample rate."""
+        return self._decoded()[0]
+
+    @property
+    def sr(self):
+        return self._decoded()[1]
+
+    @property
+    def duration(self):
+        y, sr = self._decoded()
+        return len(y) / sr
+
+    def resampled(self, target_sr):
+        import librosa
+
+        y, sr = self._decoded()
+        if target_sr == sr:
+            return y
+        return self._view("resampled", target_sr, lambda: librosa.resample(y, orig_sr=sr, target_sr=target_sr))
+
+    def spectrogram(self):
+        """The multi-resolution SpectrogramEngine of this recording."""
+        from utils.spectrogram import get_spectrogram_engine
+
+        y, sr = self._decoded()
+        return get_spectrogram_engine(self.key, y, sr)
+
+    def f0(self, engine="fast", **kwargs):
+        """PitchTrack from utils.pitch.estimate_f0, cached per engine."""
+        from utils.pitch import estimate_f0
+
+        y, sr = self._decoded()
+        return estimate_f0(self.key, y, sr, engine=engine, **kwargs)
+
+    def formants(self):
+        """FormantTrack from utils.formants.formant_track."""
+        from utils.formants import formant_track
+
+        y, sr = self._decoded()
+        return self._view("formants", None, lambda: formant_track(y, sr))
+
+    def rms(self, frame_length=2048, hop_length=512):
+        """RMS envelope, one value per hop."""
+        import librosa
+
+        y, _ = self._decoded()
+        return self._view("rms", (frame_length, hop_length),
+                          lambda: librosa.feature.rms(y=y, frame_length=frame_length, hop_length=hop_length)[0])
+
+    @property
+    def pcm16(self):
+        """16-bit PCM WAV bytes for playback and speech recognition."""
+        y, sr = self._decoded()
+        return self._view("pcm16", None, lambda: to_wav_bytes(y, sr))
+
+
+def get_asset(uploaded_file):
+    """AudioAsset for a Streamlit upload (or raw bytes)."""
+    data = uploaded_file.getvalue() if hasattr(uploaded_file, "getvalue") else uploaded_file
+    return AudioAsset(data)
@@ -0,0 +1,134 @@
+"""In-memory cache of decoded audio, keyed by a hash of the uploaded bytes."""
+import hashlib
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+import numpy as np
+
+from utils import metrics
+from utils.metrics import timed_function
+
+# Upper bound for decoded audio kept in memory by all sessions together
+DECODED_AUDIO_CACHE_BYTES = 256 * 1024 * 1024
+
+
+def content_hash(data):
+    """Return a stable hex digest for a block of bytes."""
+    return hashlib.sha1(bytes(data)).hexdigest()
+
+
+def _nbytes(value):
+    """Approximate memory used by a cached value."""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, (tuple, list)):
+        return sum(_nbytes(v) for v in value)
+    if isinstance(value, dict):
+        return sum(_nbytes(v) for v in value.values())
+    return 64
+
+
+class LRUCache:
+    """Thread-safe LRU mapping bounded by the total size of its values.
+
+    Caches given a name report their hit and miss counts to utils.metrics.
+    """
+
+    def __init__(self, max_bytes, sizeof=_nbytes, name=None):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        if name:
+            metrics.register_cache(name, self)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._items
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._items:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._items.move_to_end(key)
+            return self._items[key][0]
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        with self._lock:
+            if key in self._items:
+                self.total_bytes -= self._items.pop(key)[1]
+            # Values larger than the whole budget are returned but never stored
+            if size > self.max_bytes:
+                return value
+            self._items[key] = (value, size)
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._items.popitem(last=False)
+                self.total_bytes -= evicted_size
+        return value
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value for key, computing and storing it on a miss."""
+        value = self.get(key)
+        if value is None:
+            value = self.put(key, compute())
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.total_bytes = 0
+
+
+_decoded_audio = LRUCache(DECODED_AUDIO_CACHE_BYTES, name="decoded_audio")
+
+
+@timed_function("decode")
+def _decode(data):
+    import librosa
+
+    y, sr = librosa.load(BytesIO(data), sr=None)  # Load without resampling
+    return y, sr
+
+
+def decode_audio(data, key=None):
+    """Decode audio bytes once and return (key, samples, sample_rate).
+
+    Repeated calls with the same bytes are served from memory, so slider
+    changes and reruns never decode the same upload twice. Callers that
+    already hold the content hash pass it as `key`, which skips copying and
+    hashing the bytes on every lookup.
+    """
+    if key is None:
+        data = bytes(data)
+        key = content_hash(data)
+    y, sr = _decoded_audio.get_or_compute(key, lambda: _decode(data))
+    return key, y, sr
+
+
+def pcm16_to_float(pcm):
+    """Float32 samples in [-1, 1] from 16-bit PCM samples."""
+    return np.asarray(pcm, dtype=np.float32) / 32767
+
+
+def to_wav_bytes(y, sr):
+    """Encode float samples in [-1, 1] as 16-bit PCM WAV bytes for playback."""
+    from scipy.io.wavfile import write
+
+    pcm = np.int16(np.clip(y, -1.0, 1.0) * 32767)
+    buffer = BytesIO()
+    write(buffer, sr, pcm)
+    return buffer.getvalue()
@@ -0,0 +1,137 @@
+"""Streaming audio conversion shared by the pages."""
+import os
+import shutil
+import struct
+import subprocess
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from utils.metrics import timed_function
+
+# Bytes moved per read/write when piping audio through ffmpeg
+BLOCK_SIZE = 64 * 1024
+# Frames per block when converting with soundfile
+SOUNDFILE_BLOCK_FRAMES = 32 * 1024
+
+
+def ffmpeg_exe():
+    """Path to an ffmpeg binary: the system one, or the one bundled with imageio-ffmpeg."""
+    exe = shutil.which("ffmpeg")
+    if exe:
+        return exe
+    try:
+        import imageio_ffmpeg
+
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return None
+
+
+def _copy_blocks(src, dst, block_size=BLOCK_SIZE):
+    while True:
+        block = src.read(block_size)
+        if not block:
+            break
+        dst.write(block)
+
+
+def _fix_wav_sizes(dst, start):
+    """Fill in RIFF and data chunk sizes that ffmpeg leaves unset on a pipe."""
+    end = dst.tell()
+    dst.seek(start)
+    header = dst.read(256)
+    data_at = header.find(b"data")
+    if header[:4] == b"RIFF" and data_at >= 0:
+        dst.seek(start + 4)
+        dst.write(struct.pack("<I", min(end - start - 8, 0xFFFFFFFF)))
+        dst.seek(start + data_at + 4)
+        dst.write(struct.pack("<I", min(end - start - data_at - 8, 0xFFFFFFFF)))
+    dst.seek(end)
+
+
+def _convert_ffmpeg(exe, src, dst, block_size):
+    command = [exe, "-hide_banner", "-loglevel", "error", "-i", "pipe:0",
+               "-map_metadata", "-1", "-fflags", "+bitexact", "-f", "wav", "pipe:1"]
+    process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    def feed():
+        try:
+            _copy_blocks(src, process.stdin, block_size)
+        except BrokenPipeError:
+            pass  # ffmpeg stopped early; its exit code reports why
+        finally:
+            process.stdin.close()
+
+    # stdin is fed from a thread while stdout is drained here, so neither pipe fills up
+    feeder = threading.Thread(target=feed, daemon=True)
+    feeder.start()
+    _copy_blocks(process.stdout, dst, block_size)
+    feeder.join()
+    error = process.stderr.read().decode(errors="replace")
+    if process.wait() != 0:
+        raise RuntimeError(f"ffmpeg could not convert the file: {error.strip()}")
+
+
+def _convert_soundfile(src, dst):
+    import soundfile as sf
+
+    with sf.SoundFile(src) as f, sf.SoundFile(dst, "w", samplerate=f.samplerate,
+                                              channels=f.channels, format="WAV", subtype="PCM_16") as out:
+        for block in f.blocks(blocksize=SOUNDFILE_BLOCK_FRAMES, dtype="float32"):
+            out.write(block)
+
+
+@timed_function("convert_to_wav")
+def convert_to_wav(src, dst=None, block_size=BLOCK_SIZE):
+    """Convert an audio file object (MP3 or anything ffmpeg reads) to 16-bit WAV.
+
+    Audio is streamed through an ffmpeg pipe in fixed-size blocks, falling back
+    to block-wise soundfile decoding when ffmpeg is not available, so only the
+    output is ever held in full. Writes to `dst` (a BytesIO by default) and
+    returns it positioned at the start.
+    """
+    dst = BytesIO() if dst is None else dst
+    start = dst.tell()
+    exe = ffmpeg_exe()
+    if exe:
+        _convert_ffmpeg(exe, src, dst, block_size)
+        _fix_wav_sizes(dst, start)
+    else:
+        _convert_soundfile(src, dst)
+    dst.seek(start)
+    return dst
+
+
+def convert_many_to_zip(files, max_workers=4):
+    """Convert many (name, file object) pairs to WAV in parallel and zip them.
+
+    Each conversion streams into its own temporary file, so memory stays
+    bounded while several ffmpeg processes run at once. Returns
+    (zip BytesIO, {name: error}) for files that failed.
+    """
+    files = list(files)
+    errors = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        def convert(index_item):
+            index, (name, src) = index_item
+            path = os.path.join(workdir, f"{index}.wav")
+            try:
+                with open(path, "w+b") as dst:
+                    convert_to_wav(src, dst)
+                return name, path
+            except Exception as e:
+                errors[name] = str(e)
+                return name, None
+
+        archive = BytesIO()
+        with ThreadPoolExecutor(max_workers=max_workers) as pool, \
+                zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zf:
+            for name, path in pool.map(convert, enumerate(files)):
+                if path is not None:
+                    zf.write(path, os.path.splitext(os.path.basename(name))[0] + ".wav")
+                    os.remove(path)
+    archive.seek(0)
+    return archive, errors
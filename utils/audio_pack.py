@@ -0,0 +1,101 @@
+"""Indexed audio pack: many short clips in one file plus an offset table."""
+import json
+import mmap
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.tts_cache import gtts_synthesizer
+
+# Default location of the pre-synthesized Words-by-Stress pack
+STRESS_AUDIO_PACK = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                 "data", "stress_words.pack")
+
+
+def _index_path(path):
+    return path + ".json"
+
+
+def synthesize_with_retry(synthesizer, text, lang, tld=None, retries=4, backoff=0.5):
+    """Call the synthesizer, retrying with exponential backoff on failure."""
+    for attempt in range(retries + 1):
+        try:
+            return synthesizer(text, lang, tld)
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep(backoff * 2 ** attempt)
+
+
+def build_audio_pack(texts, path, lang="en", tld=None, synthesizer=gtts_synthesizer,
+                     max_workers=8, retries=4, backoff=0.5, progress=None):
+    """Synthesize every text concurrently and write them into one pack file.
+
+    Work is spread over a bounded thread pool; each clip is retried with
+    exponential backoff. The pack is the clips concatenated in order, and
+    `<path>.json` maps each text to its (offset, length). Both files are
+    replaced atomically. Returns the list of texts that failed.
+    """
+    texts = list(dict.fromkeys(texts))  # Unique, order preserved
+    failed = []
+
+    def task(text):
+        try:
+            return synthesize_with_retry(synthesizer, text, lang, tld, retries, backoff)
+        except Exception:
+            failed.append(text)
+            return None
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    index = {}
+    offset = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as pool, open(path + ".tmp", "wb") as out:
+        for done, (text, data) in enumerate(zip(texts, pool.map(task, texts)), start=1):
+            if data is not None:
+                out.write(data)
+                index[text] = [offset, len(data)]
+                offset += len(data)
+            if progress:
+                progress(done, len(texts))
+    with open(_index_path(path) + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"lang": lang, "tld": tld, "clips": index}, f, ensure_ascii=False)
+    os.replace(path + ".tmp", path)
+    os.replace(_index_path(path) + ".tmp", _index_path(path))
+    return failed
+
+
+class AudioPack:
+    """Read-only, memory-mapped view of a pack built by build_audio_pack."""
+
+    def __init__(self, path):
+        with open(_index_path(path), encoding="utf-8") as f:
+            meta = json.load(f)
+        self.lang = meta["lang"]
+        self.clips = meta["clips"]
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.clips else b""
+
+    def __contains__(self, text):
+        return text in self.clips
+
+    def __len__(self):
+        return len(self.clips)
+
+    def get(self, text):
+        """Return the clip bytes for text, or None if it is not in the pack."""
+        if text not in self.clips:
+            return None
+        offset, length = self.clips[text]
+        return self._map[offset:offset + length]
+
+    def close(self):
+        if self.clips:
+            self._map.close()
+        self._file.close()
+
+
+def load_audio_pack(path=STRESS_AUDIO_PACK):
+    """Open a pack if it has been built, otherwise return None."""
+    if os.path.exists(path) and os.path.exists(_index_path(path)):
+        return AudioPack(path)
+    return None
@@ -0,0 +1,104 @@
+"""Local columnar snapshot of the stress dataset with revalidation."""
+import hashlib
+import json
+import os
+import time
+import urllib.error
+import urllib.request
+from io import BytesIO
+
+import pandas as pd
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+STRESS_CSV_URL = "https://raw.githubusercontent.com/MK316/stress2024/refs/heads/main/data/data20241216.csv"
+STRESS_SNAPSHOT = os.path.join(DATA_DIR, "stress_words.parquet")
+
+# A snapshot checked more recently than this is used without touching the network
+SNAPSHOT_MAX_AGE_SECONDS = 24 * 60 * 60
+
+
+class HTTPSource:
+    """CSV fetched over HTTP, revalidated with If-None-Match."""
+
+    def __init__(self, url, timeout=10):
+        self.url = url
+        self.timeout = timeout
+
+    def fetch(self, etag=None):
+        """Return (content, etag); content is None when the server reports no change."""
+        request = urllib.request.Request(self.url)
+        if etag:
+            request.add_header("If-None-Match", etag)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.read(), response.headers.get("ETag")
+        except urllib.error.HTTPError as e:
+            if e.code == 304:
+                return None, etag
+            raise
+
+
+class FileSource:
+    """CSV read from a local file; a stand-in for HTTPSource in tests and offline use."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def fetch(self, etag=None):
+        with open(self.path, "rb") as f:
+            content = f.read()
+        digest = hashlib.sha1(content).hexdigest()
+        return (None if digest == etag else content), digest
+
+
+def _read_meta(path):
+    try:
+        with open(path + ".json", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _write_meta(path, meta):
+    with open(path + ".json.tmp", "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(path + ".json.tmp", path + ".json")
+
+
+def load_snapshot(source, path, columns=None, max_age=SNAPSHOT_MAX_AGE_SECONDS):
+    """Load a dataset from its local Parquet snapshot, refreshing it when stale.
+
+    A snapshot checked within max_age seconds is read directly. Otherwise the
+    source is revalidated by ETag and content hash; the Parquet file is only
+    rewritten when the CSV actually changed. If the source cannot be reached
+    an existing snapshot is used as is, so the app can start offline.
+    """
+    meta = _read_meta(path)
+    have_snapshot = os.path.exists(path)
+
+    if not have_snapshot or time.time() - meta.get("checked_at", 0) >= max_age:
+        try:
+            content, etag = source.fetch(meta.get("etag") if have_snapshot else None)
+        except (OSError, urllib.error.URLError):
+            if not have_snapshot:
+                raise
+            content, etag = None, meta.get("etag")
+        else:
+            meta["checked_at"] = time.time()
+        if content is not None:
+            digest = hashlib.sha1(content).hexdigest()
+            if digest != meta.get("sha1") or not have_snapshot:
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                pd.read_csv(BytesIO(content)).to_parquet(path + ".tmp", index=False)
+                os.replace(path + ".tmp", path)
+                meta["sha1"] = digest
+        meta["etag"] = etag
+        _write_meta(path, meta)
+
+    return pd.read_parquet(path, columns=columns)
+
+
+def load_stress_data(columns=None, source=None, path=STRESS_SNAPSHOT):
+    """Load the Words-by-Stress dataset from its local snapshot."""
+    return load_snapshot(source or HTTPSource(STRESS_CSV_URL), path, columns=columns)
@@ -0,0 +1,65 @@
+"""Min/max-per-pixel decimation so plot payloads scale with screen width."""
+import numpy as np
+
+from utils.metrics import timed_function
+from utils.render import DISPLAY_WIDTH
+
+
+def minmax_decimate(x, y, width=DISPLAY_WIDTH, x_range=None):
+    """Reduce a sorted time series to the min and max of each pixel column.
+
+    Only the part inside x_range (default: everything) is kept. The result has
+    at most 2 * width points, in x order, and still shows every peak, so a
+    line plot of it looks the same as a plot of the full signal. NaN gaps
+    (e.g. unvoiced F0 frames) survive as NaN.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=np.float64)
+    if x_range is not None:
+        lo, hi = np.searchsorted(x, x_range[0], side="left"), np.searchsorted(x, x_range[1], side="right")
+        x, y = x[lo:hi], y[lo:hi]
+    if len(x) <= 2 * width:
+        return x, y
+
+    # Equal-sized buckets; the tail is padded with NaN
+    size = int(np.ceil(len(y) / width))
+    buckets = int(np.ceil(len(y) / size))
+    padded = np.full(buckets * size, np.nan)
+    padded[:len(y)] = y
+    padded = padded.reshape(buckets, size)
+
+    empty = np.isnan(padded).all(axis=1)
+    lo_idx = np.argmin(np.where(np.isnan(padded), np.inf, padded), axis=1)
+    hi_idx = np.argmax(np.where(np.isnan(padded), -np.inf, padded), axis=1)
+    first, second = np.minimum(lo_idx, hi_idx), np.maximum(lo_idx, hi_idx)
+    offsets = np.arange(buckets) * size
+    index = np.stack([offsets + first, offsets + second], axis=1).reshape(-1)
+    index = np.minimum(index, len(y) - 1)
+
+    y_out = y[index]
+    y_out[np.repeat(empty, 2)] = np.nan
+    return x[index], y_out
+
+
+@timed_function("plot_series")
+def decimated_scatter(x, y, x_range=None, width=DISPLAY_WIDTH, **kwargs):
+    """A go.Scatter of the series decimated to the display width."""
+    import plotly.graph_objects as go
+
+    x, y = minmax_decimate(x, y, width=width, x_range=x_range)
+    return go.Scatter(x=x, y=y, **kwargs)
+
+
+def zoom_slider(label, x_min, x_max, key=None):
+    """Streamlit range slider for the visible time window.
+
+    Moving it re-decimates only the selected window, so zooming in brings
+    back full detail while each payload stays bounded by the screen width.
+    """
+    import streamlit as st
+
+    x_min, x_max = float(x_min), float(x_max)
+    if x_max <= x_min:
+        return x_min, x_max
+    return st.slider(label, min_value=x_min, max_value=x_max, value=(x_min, x_max),
+                     step=max((x_max - x_min) / 1000, 0.001), key=key)
@@ -0,0 +1,182 @@
+"""Formant (F1-F3) tracking by LPC, with every frame solved in one batch."""
+from collections import namedtuple
+
+import numpy as np
+
+from utils.metrics import timed_function
+from utils.pitch import decimate
+
+# Audio is resampled so the LPC spectrum covers 0 to MAX_FORMANT Hz
+MAX_FORMANT = 5500
+LPC_SR = 2 * MAX_FORMANT
+LPC_ORDER = 12  # Two poles per expected formant, plus two for the spectral slope
+FRAME_SECONDS = 0.025
+HOP_SECONDS = 0.01
+PRE_EMPHASIS = 0.97
+# Poles outside these limits are not treated as formants
+MIN_FORMANT_HZ = 90
+MAX_BANDWIDTH_HZ = 400
+N_FORMANTS = 3
+# Frames quieter than this relative to the loudest frame are skipped
+SILENCE_DB = -30.0
+
+FormantTrack = namedtuple("FormantTrack", ["formants", "bandwidths", "times"])
+
+
+def _frames(y, sr):
+    """Pre-emphasised, Hamming-windowed frames of y as a (n_frames, frame_length) array."""
+    frame_length = int(FRAME_SECONDS * sr)
+    hop_length = int(HOP_SECONDS * sr)
+    y = np.append(y[:1], y[1:] - PRE_EMPHASIS * y[:-1]).astype(np.float64)
+    if len(y) < frame_length:
+        y = np.pad(y, (0, frame_length - len(y)))
+    frames = np.lib.stride_tricks.sliding_window_view(y, frame_length)[::hop_length]
+    times = (np.arange(len(frames)) * hop_length + frame_length / 2) / sr
+    return frames * np.hamming(frame_length), times
+
+
+def _autocorrelation(frames, order):
+    """First order + 1 autocorrelation lags of every frame, via one batched FFT."""
+    n_fft = 1 << int(np.ceil(np.log2(2 * frames.shape[1])))
+    power = np.abs(np.fft.rfft(frames, n_fft)) ** 2
+    return np.fft.irfft(power, n_fft)[:, :order + 1]
+
+
+def levinson(r, order=LPC_ORDER):
+    """Solve the LPC normal equations of all frames at once (Levinson-Durbin).
+
+    r has shape (n_frames, order + 1). The recursion runs over the model
+    order, each step updating every frame with array operations. Returns
+    predictor polynomials a (n_frames, order + 1) with a[:, 0] == 1.
+    """
+    n = r.shape[0]
+    a = np.zeros((n, order + 1))
+    a[:, 0] = 1.0
+    error = r[:, 0].copy()
+    for i in range(1, order + 1):
+        # Silent frames have zero error; their reflection coefficient is left at 0
+        k = -np.einsum("ij,ij->i", a[:, :i], r[:, i:0:-1])
+        np.divide(k, error, out=k, where=error > 0)
+        a[:, 1:i + 1] += k[:, None] * a[:, i - 1::-1]
+        error *= 1.0 - k ** 2
+    return a
+
+
+def _roots(a):
+    """Roots of every predictor polynomial, from batched companion-matrix eigenvalues."""
+    n, p = a.shape[0], a.shape[1] - 1
+    companion = np.zeros((n, p, p))
+    companion[:, 0, :] = -a[:, 1:]
+    companion[:, np.arange(1, p), np.arange(p - 1)] = 1.0
+    return np.linalg.eigvals(companion)
+
+
+def _formants_from_roots(roots, sr, n_formants=N_FORMANTS):
+    """Lowest n_formants resonances per frame; NaN where fewer were found."""
+    freqs = np.angle(roots) * sr / (2 * np.pi)
+    with np.errstate(divide="ignore"):
+        bandwidths = -np.log(np.abs(roots)) * sr / np.pi
+    valid = (roots.imag > 0) & (freqs > MIN_FORMANT_HZ) & (bandwidths < MAX_BANDWIDTH_HZ)
+    freqs = np.where(valid, freqs, np.inf)
+    order = np.argsort(freqs, axis=1)[:, :n_formants]
+    formants = np.take_along_axis(freqs, order, axis=1)
+    bandwidths = np.take_along_axis(bandwidths, order, axis=1)
+    missing = ~np.isfinite(formants)
+    formants[missing] = np.nan
+    bandwidths[missing] = np.nan
+    return formants, bandwidths
+
+
+def _lpc_formants(frames, sr):
+    a = levinson(_autocorrelation(frames, LPC_ORDER), LPC_ORDER)
+    return _formants_from_roots(_roots(a), sr)
+
+
+def _prepare(y, sr):
+    """Resampled frames, their times and a mask of frames loud enough to analyse."""
+    y, sr = decimate(np.asarray(y, dtype=np.float32), sr, LPC_SR)
+    frames, times = _frames(y, sr)
+    energy = np.mean(frames ** 2, axis=1)
+    with np.errstate(divide="ignore"):
+        level = 10 * np.log10(energy / max(energy.max(initial=0.0), 1e-20))
+    return frames, times, level > SILENCE_DB, sr
+
+
+@timed_function("formants")
+def formant_track(y, sr):
+    """FormantTrack of a recording; silent frames are NaN."""
+    frames, times, loud, lpc_sr = _prepare(y, sr)
+    formants = np.full((len(frames), N_FORMANTS), np.nan)
+    bandwidths = np.full((len(frames), N_FORMANTS), np.nan)
+    if loud.any():
+        formants[loud], bandwidths[loud] = _lpc_formants(frames[loud], lpc_sr)
+    return FormantTrack(formants, bandwidths, times)
+
+
+def vowel_formants(formants):
+    """Median F1-F3 over the middle third of the analysed frames (the vowel's steady state)."""
+    analysed = formants[~np.isnan(formants[:, 0])]
+    n = len(analysed)
+    if n == 0:
+        return np.full(N_FORMANTS, np.nan)
+    steady = analysed[n // 3:max(2 * n // 3, n // 3 + 1)]
+    return np.nanmedian(steady, axis=0)
+
+
+@timed_function("formants_batch")
+def analyze_vowels(files):
+    """F1-F3 of many vowel tokens; returns a DataFrame with one row per token.
+
+    `files` is an iterable of (token_name, wav_bytes). The loud frames of all
+    tokens are stacked into one matrix, so LPC analysis of a whole class set
+    is a single batch of array operations.
+    """
+    import pandas as pd
+    import soundfile as sf
+    from io import BytesIO
+
+    rows, stacks, owners = [], [], []
+    lpc_sr = None
+    for name, data in files:
+        try:
+            y, sr = sf.read(BytesIO(data), dtype="float32", always_2d=True)
+            frames, _, loud, lpc_sr_token = _prepare(y.mean(axis=1), sr)
+        except Exception as e:
+            rows.append({"token": name, "error": str(e)})
+            continue
+        if lpc_sr is None:
+            lpc_sr = lpc_sr_token
+        if lpc_sr_token != lpc_sr:
+            # Tokens recorded below LPC_SR are analysed on their own
+            formants = formant_track(y.mean(axis=1), sr).formants
+            rows.append({"token": name, "duration_s": len(y) / sr,
+                         **dict(zip(["F1", "F2", "F3"], vowel_formants(formants))), "error": ""})
+            continue
+        owners.append((len(rows), int(loud.sum())))
+        stacks.append(frames[loud])
+        rows.append({"token": name, "duration_s": len(y) / sr, "error": ""})
+
+    if stacks:
+        formants, _ = _lpc_formants(np.concatenate(stacks), lpc_sr)
+        start = 0
+        for row, n in owners:
+            rows[row].update(zip(["F1", "F2", "F3"], vowel_formants(formants[start:start + n])))
+            if n == 0:
+                rows[row]["error"] = "No voiced frames"
+            start += n
+    return pd.DataFrame(rows, columns=["token", "duration_s", "F1", "F2", "F3", "error"])
+
+
+def vowel_chart(table, label="token"):
+    """F2-F1 scatter in the usual vowel-chart orientation (front vowels on the left, high on top)."""
+    import plotly.graph_objects as go
+
+    fig = go.Figure(go.Scatter(x=table["F2"], y=table["F1"], mode="markers+text", text=table[label],
+                               textposition="top center", marker=dict(size=9, color="#FF9933")))
+    fig.update_layout(
+        title="Vowel Chart (F1 vs F2)",
+        xaxis=dict(title="F2 (Hz)", autorange="reversed"),
+        yaxis=dict(title="F1 (Hz)", autorange="reversed"),
+        height=500,
+    )
+    return fig
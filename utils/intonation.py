@@ -0,0 +1,204 @@
+"""Intonation scoring: pitch and intensity contours aligned by banded DTW."""
+import os
+from collections import namedtuple
+from io import BytesIO
+
+import numpy as np
+
+from utils.audio_cache import LRUCache
+from utils.jobs import report_progress
+from utils.metrics import timed_function
+from utils.pitch import fast_track
+
+# Wider than the pitch page's range so synthesized and higher voices are tracked too
+CONTOUR_FMIN = 60
+CONTOUR_FMAX = 400
+# Contours are compared at 50 frames per second
+CONTOUR_HOP_SECONDS = 0.02
+# Frames quieter than this relative to the loudest frame are trimmed from the ends
+TRIM_DB = -35.0
+# One semitone of pitch difference costs as much as this many dB of intensity difference
+DB_PER_SEMITONE = 10.0
+# Sakoe-Chiba band half-width around the (slanted) diagonal; fixed, so alignment is linear in length
+BAND_FRAMES = int(0.5 / CONTOUR_HOP_SECONDS)
+# A mean aligned difference of this many semitones gives a score of 1/e
+SCORE_SCALE_SEMITONES = 3.0
+
+REFERENCE_CONTOURS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                  "data", "intonation_refs.npz")
+
+# Pitch in semitones relative to the speaker's median, intensity in dB relative to the loudest frame
+Contour = namedtuple("Contour", ["pitch", "intensity", "times"])
+
+_references = LRUCache(16 * 1024 * 1024, name="intonation_refs")
+_packed_references = None
+
+
+def contour_from_audio(y, sr):
+    """Speaker-normalised pitch and intensity contour of a recording.
+
+    Silence at both ends is trimmed and unvoiced gaps inside the utterance
+    are bridged by linear interpolation, so the contour is continuous.
+    """
+    y = np.asarray(y, dtype=np.float32)
+    track = fast_track(y, sr, CONTOUR_FMIN, CONTOUR_FMAX)
+    step = 1
+    if len(track.times) > 1:
+        step = max(int(round(CONTOUR_HOP_SECONDS / (track.times[1] - track.times[0]))), 1)
+    times = track.times[::step]
+    f0 = track.f0[::step]
+
+    # Intensity of a window of one contour hop around each frame
+    half = int(CONTOUR_HOP_SECONDS * sr / 2)
+    centres = np.minimum((times * sr).astype(int), max(len(y) - 1, 0))
+    padded = np.pad(y.astype(np.float64) ** 2, (half, half))
+    cumulative = np.concatenate([[0.0], np.cumsum(padded)])
+    energy = (cumulative[centres + 2 * half + 1] - cumulative[centres]) / (2 * half + 1)
+    with np.errstate(divide="ignore"):
+        intensity = 10 * np.log10(energy / max(energy.max(initial=0.0), 1e-20))
+
+    voiced = ~np.isnan(f0)
+    loud = np.flatnonzero((intensity > TRIM_DB) & voiced)
+    if len(loud) < 2:
+        return Contour(np.zeros(0), np.zeros(0), np.zeros(0))
+    span = slice(loud[0], loud[-1] + 1)
+    f0, intensity, times, voiced = f0[span], intensity[span], times[span], voiced[span]
+    f0 = np.interp(times, times[voiced], f0[voiced])
+    pitch = 12 * np.log2(f0 / np.median(f0))
+    return Contour(pitch, np.maximum(intensity, TRIM_DB), times - times[0])
+
+
+def _features(contour):
+    return np.column_stack([contour.pitch, contour.intensity / DB_PER_SEMITONE])
+
+
+@timed_function("dtw")
+def banded_dtw(x, y, band=BAND_FRAMES):
+    """Length-normalised DTW distance between two feature sequences, in semitones.
+
+    x (n, k) and y (m, k) are compared with an L1 local cost. Only cells
+    within `band` frames of the diagonal (a Sakoe-Chiba band, slanted when
+    the lengths differ) are evaluated. Cells on one anti-diagonal depend
+    only on the two previous anti-diagonals, so each is computed as one
+    array operation, and three buffers are reused in turn with only the band
+    reset each step: time is O((n + m) * band) and memory O(n). Steps use
+    symmetric weights (2 for a diagonal step), so the total divided by
+    n + m is a mean per-frame difference.
+    """
+    x = np.asarray(x, dtype=np.float64).reshape(len(x), -1)
+    y = np.asarray(y, dtype=np.float64).reshape(len(y), -1)
+    n, m = len(x), len(y)
+    if n == 0 or m == 0:
+        return np.inf
+    slope = (m - 1) / (n - 1) if n > 1 else 0.0
+    if n == 1:
+        band = m  # A single frame aligns with every frame of y
+    band = max(band, int(np.ceil(slope)))  # Keep the band connected when y is much longer
+
+    # Row i of an anti-diagonal is stored at index i + 1; index 0 is the boundary.
+    # Buffers hold anti-diagonals d - 2, d - 1 and d in turn; cells outside the band stay inf.
+    buffers = [np.full(n + 1, np.inf) for _ in range(3)]
+    written = [slice(0, 0)] * 3
+    for d in range(n + m - 1):
+        cur, prev1, prev2 = buffers[d % 3], buffers[(d - 1) % 3], buffers[(d - 2) % 3]
+        cur[written[d % 3]] = np.inf
+        written[d % 3] = slice(0, 0)
+        lo = max(0, d - m + 1, int(np.ceil((d - band) / (1 + slope))))
+        hi = min(n - 1, d, int(np.floor((d + band) / (1 + slope))))
+        if lo <= hi:
+            i = np.arange(lo, hi + 1)
+            cost = np.abs(x[i] - y[d - i]).sum(axis=1)
+            if d == 0:
+                cur[1] = cost[0]
+            else:
+                cur[i + 1] = np.minimum(np.minimum(prev1[i], prev1[i + 1]) + cost, prev2[i] + 2 * cost)
+            written[d % 3] = slice(lo + 1, hi + 2)
+    return buffers[(n + m - 2) % 3][n] / (n + m)
+
+
+def intonation_score(contour, reference):
+    """Similarity in [0, 1] of a contour to a reference (1 means identical)."""
+    if len(contour.pitch) < 2 or len(reference.pitch) < 2:
+        return np.nan
+    distance = banded_dtw(_features(contour), _features(reference))
+    return float(np.exp(-distance / SCORE_SCALE_SEMITONES))
+
+
+def _decode_speech(data):
+    """Samples of MP3 or WAV speech bytes."""
+    import soundfile as sf
+
+    from utils.audio_io import convert_to_wav
+
+    try:
+        y, sr = sf.read(BytesIO(data), dtype="float32", always_2d=True)
+    except Exception:
+        y, sr = sf.read(convert_to_wav(BytesIO(data)), dtype="float32", always_2d=True)
+    return y.mean(axis=1), sr
+
+
+def build_reference_contours(sentences, path=REFERENCE_CONTOURS, synthesizer=None):
+    """Synthesize each sentence, extract its contour and save all of them to one .npz file."""
+    if synthesizer is None:
+        from utils.tts_cache import get_tts_cache
+
+        synthesizer = lambda text: get_tts_cache().get(text, "en")
+    arrays = {"sentences": np.array(sentences)}
+    for index, sentence in enumerate(sentences):
+        contour = contour_from_audio(*_decode_speech(synthesizer(sentence)))
+        for field in Contour._fields:
+            arrays[f"{index}_{field}"] = getattr(contour, field)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    np.savez_compressed(path, **arrays)
+
+
+def _load_packed(path=REFERENCE_CONTOURS):
+    global _packed_references
+    if _packed_references is None:
+        _packed_references = {}
+        if os.path.exists(path):
+            with np.load(path) as archive:
+                for index, sentence in enumerate(archive["sentences"]):
+                    _packed_references[str(sentence)] = Contour(*(archive[f"{index}_{field}"]
+                                                                  for field in Contour._fields))
+    return _packed_references
+
+
+def reference_contour(sentence):
+    """Reference contour of a practice sentence, computed once per process.
+
+    Contours prebuilt by scripts/build_intonation_refs.py are used when
+    present; otherwise the sentence is synthesized through the TTS cache.
+    """
+    def compute():
+        packed = _load_packed().get(sentence)
+        if packed is not None:
+            return packed
+        from utils.tts_cache import get_tts_cache
+
+        return contour_from_audio(*_decode_speech(get_tts_cache().get(sentence, "en")))
+    return _references.get_or_compute(sentence, compute)
+
+
+def score_batch(submissions):
+    """Intonation scores of (student, sentence, wav_bytes) submissions; NaN where scoring fails.
+
+    Each sentence's reference is looked up once, so a sentence whose
+    reference cannot be built fails fast for all of its submissions.
+    """
+    references = {}
+    for sentence in dict.fromkeys(sentence for _, sentence, _ in submissions):
+        try:
+            references[sentence] = reference_contour(sentence)
+        except Exception:
+            references[sentence] = None
+    scores = []
+    for _, sentence, wav in submissions:
+        reference = references[sentence]
+        try:
+            scores.append(intonation_score(contour_from_audio(*_decode_speech(wav)), reference)
+                          if reference is not None else np.nan)
+        except Exception:
+            scores.append(np.nan)
+        report_progress(len(scores) / len(submissions))
+    return scores
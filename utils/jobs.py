@@ -0,0 +1,228 @@
+"""Shared worker pool for heavy analyses, with a fair queue per session.
+
+Pages hand pitch tracking, spectrograms, speech recognition and batch jobs
+to one bounded pool instead of running them on the script thread. Workers
+serve the sessions with pending jobs in turn, so one session's burst of
+uploads waits behind its own jobs rather than everyone else's. Each session
+and the server as a whole may only have so many jobs pending; beyond that
+submissions are refused and the page asks the visitor to retry.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+from utils import metrics
+
+JOB_WORKERS = int(os.environ.get("PHONETICS_JOB_WORKERS", min(os.cpu_count() or 2, 4)))
+MAX_PENDING_PER_SESSION = 4
+MAX_PENDING = 64
+POLL_SECONDS = 0.2
+
+_current = threading.local()
+
+
+class QueueFull(RuntimeError):
+    """Raised when a session or the whole server has too many pending jobs."""
+
+
+class Job:
+    """One queued call; `progress` runs from 0 to 1 while it is running.
+
+    A job may also publish a `partial` result (e.g. the contour computed so
+    far) for the page to show before the job finishes.
+    """
+
+    def __init__(self, session_id, fn, args, kwargs, label="", key=None):
+        self.session_id = session_id
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.label = label
+        self.key = key
+        self.status = "queued"
+        self.progress = 0.0
+        self.partial = None
+        self.submitted = time.perf_counter()
+        self._result = None
+        self._error = None
+        self._done = threading.Event()
+
+    def wait(self, timeout=None):
+        """Block until the job finishes or timeout passes; returns whether it finished."""
+        return self._done.wait(timeout)
+
+    def result(self):
+        """The function's return value; re-raises its exception if it failed."""
+        self._done.wait()
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+    def _run(self):
+        self.status = "running"
+        if metrics.enabled():
+            metrics.observe("job_wait", time.perf_counter() - self.submitted)
+        _current.job = self
+        try:
+            self._result = self.fn(*self.args, **self.kwargs)
+            self.status = "done"
+        except Exception as e:
+            self._error = e
+            self.status = "failed"
+        finally:
+            _current.job = None
+            self.progress = 1.0
+            self._done.set()
+
+
+def report_progress(fraction, partial=None):
+    """Record progress, and optionally a partial result, of the job running on this thread.
+
+    Outside a job this is a no-op.
+    """
+    job = getattr(_current, "job", None)
+    if job is not None:
+        if partial is not None:
+            job.partial = partial
+        job.progress = min(max(float(fraction), 0.0), 1.0)
+
+
+class JobQueue:
+    """Bounded worker pool that takes jobs round-robin across sessions."""
+
+    def __init__(self, workers=JOB_WORKERS, max_pending_per_session=MAX_PENDING_PER_SESSION,
+                 max_pending=MAX_PENDING):
+        self.workers = workers
+        self.max_pending_per_session = max_pending_per_session
+        self.max_pending = max_pending
+        self.running = 0
+        self._queues = OrderedDict()  # session id -> deque of jobs, in serving order
+        self._active = {}  # job key -> queued or running job
+        self._pending = 0
+        self._cond = threading.Condition()
+        self._threads = []
+
+    def submit(self, session_id, fn, *args, label="", key=None, **kwargs):
+        """Queue fn(*args, **kwargs) for a session and return its Job.
+
+        A job submitted with the key of one still queued or running is not
+        queued again; the existing Job is returned, so reruns of a page
+        attach to the work already in progress.
+        """
+        with self._cond:
+            if key is not None and key in self._active:
+                return self._active[key]
+            queue = self._queues.get(session_id)
+            if queue is not None and len(queue) >= self.max_pending_per_session:
+                metrics.count("jobs_rejected")
+                raise QueueFull("Too many analyses are waiting for this session.")
+            if self._pending >= self.max_pending:
+                metrics.count("jobs_rejected")
+                raise QueueFull("The server is busy.")
+            job = Job(session_id, fn, args, kwargs, label, key)
+            self._queues.setdefault(session_id, deque()).append(job)
+            self._pending += 1
+            if key is not None:
+                self._active[key] = job
+            self._start_workers()
+            self._cond.notify()
+        return job
+
+    def position(self, job):
+        """Approximate number of jobs that will start before this queued job."""
+        with self._cond:
+            queue = self._queues.get(job.session_id)
+            if queue is None or job not in queue:
+                return 0
+            index = queue.index(job)
+            # Every session is served once per round, so each contributes at most index + 1 jobs
+            return sum(min(len(q), index + 1) for q in self._queues.values()) - 1
+
+    def stats(self):
+        with self._cond:
+            return {"running": self.running, "pending": self._pending,
+                    "sessions_waiting": len(self._queues), "workers": self.workers}
+
+    def _start_workers(self):
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, name=f"job-worker-{len(self._threads)}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def _next(self):
+        """Pop the next job from the session at the head of the rotation."""
+        session_id, queue = next(iter(self._queues.items()))
+        job = queue.popleft()
+        if queue:
+            self._queues.move_to_end(session_id)
+        else:
+            del self._queues[session_id]
+        self._pending -= 1
+        return job
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._queues:
+                    self._cond.wait()
+                job = self._next()
+                self.running += 1
+            job._run()
+            with self._cond:
+                self.running -= 1
+                if job.key is not None and self._active.get(job.key) is job:
+                    del self._active[job.key]
+
+
+_default_queue = None
+_default_lock = threading.Lock()
+
+
+def get_job_queue():
+    """Return the process-wide job queue shared by all sessions."""
+    global _default_queue
+    with _default_lock:
+        if _default_queue is None:
+            _default_queue = JobQueue()
+    return _default_queue
+
+
+def session_id():
+    """Id of the Streamlit session running this script ("local" outside Streamlit)."""
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return ctx.session_id if ctx is not None else "local"
+
+
+def run_job(fn, *args, label="Working...", job_key=None, on_partial=None, **kwargs):
+    """Run fn on the shared pool from a page and return its result.
+
+    Calls with the same job_key share one job while it is in flight. Shows
+    the queue position while waiting and the job's progress while it runs;
+    each new partial result the job publishes is passed to on_partial. When
+    the queue is full the visitor is asked to retry and the script stops.
+    """
+    import streamlit as st
+
+    queue = get_job_queue()
+    try:
+        job = queue.submit(session_id(), fn, *args, label=label, key=job_key, **kwargs)
+    except QueueFull as e:
+        st.warning(f"{e} Please try again in a moment.")
+        st.stop()
+    if not job.wait(POLL_SECONDS):
+        bar = st.progress(0.0, text=label)
+        shown = None
+        while not job.wait(POLL_SECONDS):
+            if job.status == "queued":
+                bar.progress(0.0, text=f"{label} (waiting for {queue.position(job)} other job(s))")
+            else:
+                bar.progress(job.progress, text=label)
+                partial = job.partial
+                if on_partial is not None and partial is not None and partial is not shown:
+                    on_partial(partial)
+                    shown = partial
+        bar.empty()
+    return job.result()
@@ -0,0 +1,43 @@
+"""Deferred imports for heavy libraries."""
+import importlib
+import sys
+import time
+import types
+
+# Seconds spent importing each lazily loaded module, filled in on first use
+IMPORT_TIMES = {}
+
+
+class LazyModule(types.ModuleType):
+    """Stand-in module that imports the real one on first attribute access."""
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.__dict__["_module"] = None
+
+    def _load(self):
+        module = self.__dict__["_module"]
+        if module is None:
+            start = time.perf_counter()
+            module = importlib.import_module(self.__name__)
+            IMPORT_TIMES.setdefault(self.__name__, time.perf_counter() - start)
+            self.__dict__["_module"] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+
+def lazy_import(name):
+    """Return `name` as a module whose import is deferred until it is used.
+
+    Already imported modules are returned directly. Pages use this for
+    libraries needed only on some code paths, so opening a page does not pay
+    for imports the visitor never reaches.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    return LazyModule(name)
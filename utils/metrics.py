@@ -0,0 +1,228 @@
+"""Stage timings and cache counters for finding slow spots in the pages.
+
+Instrumentation is off unless PHONETICS_METRICS=1 is set or the sidebar
+debug panel switches it on; while off, `timed` costs one flag check. The
+switch is process-wide: turning it on or off in one session does so for
+every session served by this process.
+"""
+import bisect
+import functools
+import json
+import os
+import threading
+import time
+
+# Upper bounds (seconds) of the latency histogram buckets, Prometheus style
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_enabled = os.environ.get("PHONETICS_METRICS", "") not in ("", "0")
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+_caches = {}
+
+
+def enabled():
+    return _enabled
+
+
+def set_enabled(value):
+    """Turn recording on or off for the whole process."""
+    global _enabled
+    _enabled = bool(value)
+
+
+class Histogram:
+    """Count, sum, max and bucket counts of one stage's latencies."""
+
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)  # Last bucket is +Inf
+
+    def observe(self, seconds):
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+        self.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+
+    def quantile(self, q):
+        """Upper bucket bound below which a fraction q of observations fall."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for bound, n in zip(BUCKETS, self.buckets):
+            seen += n
+            if seen >= target:
+                return min(bound, self.max)
+        return self.max
+
+
+def observe(stage, seconds):
+    with _lock:
+        histogram = _histograms.get(stage)
+        if histogram is None:
+            histogram = _histograms[stage] = Histogram()
+        histogram.observe(seconds)
+
+
+def count(name, n=1):
+    """Add n to a named counter (only while metrics are enabled)."""
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def register_cache(name, cache):
+    """Report a cache's `hits` and `misses` attributes under name."""
+    _caches[name] = cache
+
+
+class _Timer:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timed(stage):
+    """Time a block as `with timed("stft"):` while metrics are enabled."""
+    return _Timer(stage) if _enabled else _NULL_TIMER
+
+
+def timed_function(stage):
+    """Decorator form of `timed` for a whole function."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                observe(stage, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+def snapshot():
+    """All metrics as plain data: stages, counters, caches and import times."""
+    from utils.lazy import IMPORT_TIMES
+
+    with _lock:
+        stages = {
+            stage: {
+                "count": h.count,
+                "sum_s": h.sum,
+                "mean_s": h.sum / h.count if h.count else 0.0,
+                "p50_s": h.quantile(0.5),
+                "p95_s": h.quantile(0.95),
+                "max_s": h.max,
+                "buckets": dict(zip([str(b) for b in BUCKETS] + ["+Inf"], h.buckets)),
+            }
+            for stage, h in sorted(_histograms.items())
+        }
+        counters = dict(sorted(_counters.items()))
+    caches = {name: {"hits": cache.hits, "misses": cache.misses} for name, cache in sorted(_caches.items())}
+    return {"stages": stages, "counters": counters, "caches": caches, "imports_s": dict(IMPORT_TIMES)}
+
+
+def to_json():
+    return json.dumps(snapshot(), indent=2)
+
+
+def to_prometheus():
+    """Metrics in the Prometheus text exposition format."""
+    data = snapshot()
+    lines = ["# TYPE phonetics_stage_seconds histogram"]
+    for stage, s in data["stages"].items():
+        cumulative = 0
+        for bound, n in s["buckets"].items():
+            cumulative += n
+            lines.append(f'phonetics_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+        lines.append(f'phonetics_stage_seconds_sum{{stage="{stage}"}} {s["sum_s"]:.6f}')
+        lines.append(f'phonetics_stage_seconds_count{{stage="{stage}"}} {s["count"]}')
+    lines.append("# TYPE phonetics_events_total counter")
+    for name, value in data["counters"].items():
+        lines.append(f'phonetics_events_total{{name="{name}"}} {value}')
+    lines.append("# TYPE phonetics_cache_requests_total counter")
+    for name, c in data["caches"].items():
+        lines.append(f'phonetics_cache_requests_total{{cache="{name}",result="hit"}} {c["hits"]}')
+        lines.append(f'phonetics_cache_requests_total{{cache="{name}",result="miss"}} {c["misses"]}')
+    lines.append("# TYPE phonetics_import_seconds gauge")
+    for module, seconds in data["imports_s"].items():
+        lines.append(f'phonetics_import_seconds{{module="{module}"}} {seconds:.6f}')
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+    for cache in _caches.values():
+        cache.hits = cache.misses = 0
+
+
+def _on_toggle():
+    import streamlit as st
+
+    set_enabled(st.session_state["metrics_enabled"])
+
+
+def debug_panel():
+    """Sidebar switch and tables for the metrics; pages call this once.
+
+    Only a click on the checkbox changes the (process-wide) switch; on other
+    reruns the checkbox just shows its current state.
+    """
+    import streamlit as st
+
+    with st.sidebar.expander("Performance metrics"):
+        st.session_state["metrics_enabled"] = _enabled
+        st.checkbox("Record timings", key="metrics_enabled", on_change=_on_toggle,
+                    help="Applies to every session served by this process.")
+        if not _enabled:
+            return
+        import pandas as pd
+
+        data = snapshot()
+        if data["stages"]:
+            stages = pd.DataFrame(data["stages"]).T.drop(columns="buckets")
+            st.dataframe(stages[["count", "mean_s", "p50_s", "p95_s", "max_s"]], use_container_width=True)
+        else:
+            st.caption("No stages timed yet.")
+        if data["caches"]:
+            st.dataframe(pd.DataFrame(data["caches"]).T, use_container_width=True)
+        if data["imports_s"]:
+            st.caption("Deferred imports (s)")
+            st.dataframe(pd.Series(data["imports_s"], name="seconds"), use_container_width=True)
+        col1, col2 = st.columns(2)
+        col1.download_button("JSON", to_json(), file_name="metrics.json", mime="application/json")
+        col2.download_button("Prometheus", to_prometheus(), file_name="metrics.txt", mime="text/plain")
+        if st.button("Reset metrics"):
+            reset()
@@ -0,0 +1,347 @@
+"""F0 estimation: a fast vectorized YIN engine next to librosa's pYIN."""
+import sys
+import threading
+import types
+from collections import namedtuple
+from contextlib import contextmanager
+from math import gcd
+
+import numpy as np
+
+from utils.audio_cache import LRUCache, pcm16_to_float
+from utils.jobs import report_progress
+from utils.metrics import count, timed_function
+
+# Minimum and maximum expected frequency (typical human pitch range)
+FMIN = 50
+FMAX = 300
+
+# Sample rate the fast engine decimates to; ample for voices below 300 Hz
+FAST_SR = 8000
+FAST_HOP_SECONDS = 0.01
+YIN_THRESHOLD = 0.15
+# Frames quieter than this relative to the loudest frame are treated as unvoiced
+SILENCE_DB = -40.0
+
+ENGINES = ("fast", "accurate")
+
+# Length of audio analysed per block in streaming mode
+STREAM_BLOCK_SECONDS = 10.0
+# Recordings longer than this are analysed in streaming mode by default
+STREAM_THRESHOLD_SECONDS = 60.0
+
+PitchTrack = namedtuple("PitchTrack", ["f0", "voiced_flag", "times", "sr"])
+
+_tracks = LRUCache(64 * 1024 * 1024, name="pitch_tracks")
+
+
+def decimate(y, sr, target_sr=FAST_SR):
+    """Polyphase-resample y down to target_sr; returns (y, sr) unchanged if already lower."""
+    if sr <= target_sr:
+        return y, sr
+    from scipy.signal import resample_poly
+
+    g = gcd(int(sr), int(target_sr))
+    return resample_poly(y, target_sr // g, sr // g).astype(np.float32), target_sr
+
+
+def _frame(y, frame_length, hop_length):
+    """Centre-padded frames of y as a (n_frames, frame_length) strided view."""
+    y = np.pad(y, frame_length // 2)
+    if len(y) < frame_length:
+        y = np.pad(y, (0, frame_length - len(y)))
+    return np.lib.stride_tricks.sliding_window_view(y, frame_length)[::hop_length]
+
+
+def _yin_raw(y, sr, fmin, fmax, hop_length, threshold):
+    """F0 of every frame with a YIN trough (NaN elsewhere) and the frame RMS."""
+    min_lag = max(int(np.floor(sr / fmax)), 1)
+    max_lag = int(np.ceil(sr / fmin))
+    window = max_lag  # Integration window of one longest period
+    frame_length = window + max_lag + 1
+    frames = _frame(np.asarray(y, dtype=np.float64), frame_length, hop_length)
+
+    n_fft = 1 << int(np.ceil(np.log2(frame_length + window)))
+    spectrum = np.fft.rfft(frames, n_fft)
+    head = np.fft.rfft(frames[:, :window], n_fft)
+    corr = np.fft.irfft(spectrum * np.conj(head), n_fft)[:, :max_lag + 1]
+
+    power = np.concatenate([np.zeros((len(frames), 1)), np.cumsum(frames ** 2, axis=1)], axis=1)
+    lags = np.arange(max_lag + 1)
+    energy_lag = power[:, lags + window] - power[:, lags]
+    diff = np.maximum(power[:, [window]] + energy_lag - 2 * corr, 0)
+    diff[:, 0] = 0
+
+    # Cumulative mean normalised difference
+    cumulative = np.cumsum(diff[:, 1:], axis=1)
+    cmnd = np.ones_like(diff)
+    cmnd[:, 1:] = diff[:, 1:] * lags[1:] / np.maximum(cumulative, 1e-12)
+
+    # First trough below the threshold in the allowed lag range
+    left, mid, right = cmnd[:, min_lag - 1:max_lag - 1], cmnd[:, min_lag:max_lag], cmnd[:, min_lag + 1:max_lag + 1]
+    trough = (mid < left) & (mid <= right) & (mid < threshold)
+    has_trough = trough.any(axis=1)
+    best = np.argmax(trough, axis=1) + min_lag
+
+    # Parabolic interpolation around the chosen lag
+    rows = np.arange(len(frames))
+    a, b, c = cmnd[rows, best - 1], cmnd[rows, best], cmnd[rows, best + 1]
+    denom = a - 2 * b + c
+    shift = np.where(np.abs(denom) > 1e-12, 0.5 * (a - c) / np.where(denom == 0, 1, denom), 0)
+    period = best + np.clip(shift, -1, 1)
+
+    f0 = np.where(has_trough, sr / period, np.nan)
+    rms = np.sqrt(power[:, window] / window)
+    return f0, rms
+
+
+def _gate(f0, rms, ref_rms):
+    """Unvoice frames more than SILENCE_DB below ref_rms."""
+    loud = 20 * np.log10(np.maximum(rms, 1e-10) / max(ref_rms, 1e-10)) > SILENCE_DB
+    voiced = loud & ~np.isnan(f0)
+    return np.where(voiced, f0, np.nan), voiced
+
+
+def yin(y, sr, fmin=FMIN, fmax=FMAX, hop_length=None, threshold=YIN_THRESHOLD):
+    """Vectorized YIN over all frames at once.
+
+    The difference function of every frame is obtained from one batched FFT
+    cross-correlation, so there is no Python loop over frames.
+    Returns (f0, voiced_flag) with NaN in unvoiced frames.
+    """
+    hop_length = hop_length or max(int(sr * FAST_HOP_SECONDS), 1)
+    f0, rms = _yin_raw(y, sr, fmin, fmax, hop_length, threshold)
+    return _gate(f0, rms, rms.max(initial=0.0))
+
+
+@timed_function("f0_fast")
+def fast_track(y, sr, fmin=FMIN, fmax=FMAX):
+    """PitchTrack from the fast engine (YIN on audio decimated to FAST_SR), uncached."""
+    y_d, sr_d = decimate(y, sr)
+    hop_length = max(int(sr_d * FAST_HOP_SECONDS), 1)
+    f0, voiced = yin(y_d, sr_d, fmin, fmax, hop_length=hop_length)
+    times = np.arange(len(f0)) * hop_length / sr_d
+    return PitchTrack(f0, voiced, times, sr)
+
+
+@timed_function("f0_pyin")
+def _accurate_track(y, sr, fmin, fmax):
+    import librosa
+
+    f0, voiced_flag, _ = librosa.pyin(y, fmin=fmin, fmax=fmax, sr=sr)
+    return PitchTrack(f0, voiced_flag, librosa.times_like(f0, sr=sr), sr)
+
+
+def estimate_f0(key, y, sr, engine="fast", fmin=FMIN, fmax=FMAX):
+    """Return the PitchTrack of a recording, cached per (file hash, engine, range).
+
+    y may be 16-bit PCM (e.g. from session memory); it is converted to float
+    only when the track is not already cached.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown pitch engine: {engine!r}")
+    track = fast_track if engine == "fast" else _accurate_track
+
+    def compute():
+        samples = pcm16_to_float(y) if np.asarray(y).dtype == np.int16 else y
+        return track(samples, sr, fmin, fmax)
+    return _tracks.get_or_compute((key, engine, fmin, fmax), compute)
+
+
+def segment_f0(reader, time_min, time_max, engine="fast", key=None, fmin=FMIN, fmax=FMAX):
+    """PitchTrack of one segment of a WindowedReader, with times relative to the file.
+
+    Only the segment plus one pitch window of context per side is decoded.
+    Pass the file's content hash as `key` to cache the result per segment.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown pitch engine: {engine!r}")
+    track_fn = fast_track if engine == "fast" else _accurate_track
+    context = int(np.ceil(2 * reader.sr / fmin))
+    y, start = reader.read(time_min, time_max, pad=context)
+    if key is None:
+        track = track_fn(y, reader.sr, fmin, fmax)
+    else:
+        segment_key = (key, engine, fmin, fmax, time_min, time_max)
+        track = _tracks.get_or_compute(segment_key, lambda: track_fn(y, reader.sr, fmin, fmax))
+    times = track.times + start / reader.sr
+    keep = (times >= time_min) & (times <= time_max)
+    return PitchTrack(track.f0[keep], track.voiced_flag[keep], times[keep], track.sr)
+
+
+def stream_f0(source, block_seconds=STREAM_BLOCK_SECONDS, fmin=FMIN, fmax=FMAX):
+    """Track F0 of a WAV file block by block with constant memory.
+
+    Reads `source` (a path or file object) through soundfile in blocks of
+    block_seconds plus one pitch window of context on each side, so frames at
+    block edges see the same samples as in a whole-file analysis. Only the
+    frames centred in each block's core are yielded. The silence reference
+    level (loudest frame so far) is carried across blocks.
+
+    Yields PitchTrack pieces with absolute frame times.
+    """
+    import soundfile as sf
+
+    with sf.SoundFile(source) as f:
+        sr = f.samplerate
+        core = int(block_seconds * sr)
+        context = int(np.ceil(2 * sr / fmin))
+        ref_rms = 0.0
+        start = 0
+        while start < f.frames:
+            read_from = max(start - context, 0)
+            f.seek(read_from)
+            block = f.read(start + core + context - read_from, dtype="float32", always_2d=True).mean(axis=1)
+            y_d, sr_d = decimate(block, sr)
+            hop_length = max(int(sr_d * FAST_HOP_SECONDS), 1)
+            f0, rms = _yin_raw(y_d, sr_d, fmin, fmax, hop_length, YIN_THRESHOLD)
+            # Silence is judged against the loudest frame seen so far
+            ref_rms = max(ref_rms, float(rms.max(initial=0.0)))
+            f0, voiced = _gate(f0, rms, ref_rms)
+            times = read_from / sr + np.arange(len(f0)) * hop_length / sr_d
+            keep = (times >= start / sr) & (times < min(start + core, f.frames) / sr)
+            count("f0_stream_blocks")
+            yield PitchTrack(f0[keep], voiced[keep], times[keep], sr)
+            start += core
+
+
+def stream_track(data, fmin=FMIN, fmax=FMAX):
+    """Whole PitchTrack of WAV bytes via stream_f0, for running as a job.
+
+    After each block the contour so far is published as the job's partial
+    result, with progress measured in seconds of audio tracked.
+    """
+    import soundfile as sf
+    from io import BytesIO
+
+    duration = sf.info(BytesIO(data)).duration
+    sr = None
+    f0_parts, voiced_parts, time_parts = [], [], []
+    for part in stream_f0(BytesIO(data), fmin=fmin, fmax=fmax):
+        sr = part.sr
+        f0_parts.append(part.f0)
+        voiced_parts.append(part.voiced_flag)
+        time_parts.append(part.times)
+        track = PitchTrack(np.concatenate(f0_parts), np.concatenate(voiced_parts), np.concatenate(time_parts), sr)
+        if len(part.times):
+            report_progress(part.times[-1] / duration if duration else 1.0, partial=track)
+    if sr is None:
+        return PitchTrack(np.zeros(0), np.zeros(0, dtype=bool), np.zeros(0), sf.info(BytesIO(data)).samplerate)
+    return track
+
+
+def compare_tracks(reference, estimate):
+    """Summarise how far an estimate is from a reference PitchTrack.
+
+    The estimate is interpolated onto the reference frame times. Returns
+    voicing agreement, mean absolute deviation in cents over frames voiced
+    in both, and the gross error rate (deviation above 50 cents).
+    """
+    est_voiced = np.interp(reference.times, estimate.times, estimate.voiced_flag.astype(float)) >= 0.5
+    est_f0 = np.interp(reference.times, estimate.times, np.nan_to_num(estimate.f0))
+    ref_voiced = np.asarray(reference.voiced_flag, dtype=bool)
+    both = ref_voiced & est_voiced & (est_f0 > 0)
+    if both.any():
+        cents = 1200 * np.abs(np.log2(est_f0[both] / reference.f0[both]))
+        mean_cents = float(np.mean(cents))
+        gross_error = float(np.mean(cents > 50))
+    else:
+        mean_cents = gross_error = float("nan")
+    return {
+        "voicing_agreement": float(np.mean(ref_voiced == est_voiced)),
+        "mean_abs_cents": mean_cents,
+        "gross_error_rate": gross_error,
+    }
+
+
+def summarize_f0(track):
+    """Mean, median and range of F0 over voiced frames, plus percent voiced."""
+    voiced = track.f0[np.asarray(track.voiced_flag, dtype=bool) & ~np.isnan(track.f0)]
+    summary = {"voiced_pct": 100.0 * len(voiced) / max(len(track.f0), 1)}
+    if len(voiced):
+        summary.update(mean_f0=float(np.mean(voiced)), median_f0=float(np.median(voiced)),
+                       min_f0=float(np.min(voiced)), max_f0=float(np.max(voiced)))
+        summary["range_f0"] = summary["max_f0"] - summary["min_f0"]
+    else:
+        summary.update(mean_f0=np.nan, median_f0=np.nan, min_f0=np.nan, max_f0=np.nan, range_f0=np.nan)
+    return summary
+
+
+def _analyze_one(args):
+    """Worker for analyze_batch; runs in a separate process."""
+    import soundfile as sf
+    from io import BytesIO
+
+    name, data, engine, fmin, fmax = args
+    try:
+        y, sr = sf.read(BytesIO(data), dtype="float32", always_2d=True)
+        y = y.mean(axis=1)
+        track = fast_track(y, sr, fmin, fmax) if engine == "fast" else _accurate_track(y, sr, fmin, fmax)
+        return {"speaker": name, "duration_s": len(y) / sr, **summarize_f0(track), "error": ""}
+    except Exception as e:
+        return {"speaker": name, "error": str(e)}
+
+
+_main_lock = threading.Lock()
+
+
+@contextmanager
+def _bare_main():
+    """Show a bare __main__ module while batch worker processes start.
+
+    Under Streamlit, __main__ is the page being run; multiprocessing would
+    otherwise re-run that page in every worker it starts.
+    """
+    with _main_lock:
+        main = sys.modules["__main__"]
+        sys.modules["__main__"] = types.ModuleType("__main__")
+        try:
+            yield
+        finally:
+            sys.modules["__main__"] = main
+
+
+def analyze_batch(files, engine="fast", fmin=FMIN, fmax=FMAX, max_workers=None):
+    """Summarise F0 for many recordings in parallel.
+
+    `files` is an iterable of (speaker_name, wav_bytes). Extraction is fanned
+    out over a process pool, one task per file, so throughput scales with the
+    number of cores. Workers are started by a forkserver that preloads this
+    module rather than forked from the multithreaded server, so they never
+    inherit a held lock, and no page script runs in them.
+    Returns a DataFrame with one row per speaker.
+    """
+    import multiprocessing
+    import pandas as pd
+    from concurrent.futures import ProcessPoolExecutor
+
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload([__name__])
+    tasks = [(name, data, engine, fmin, fmax) for name, data in files]
+    rows = []
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as pool:
+        # Workers are started on submit, so every start sees the bare __main__
+        with _bare_main():
+            futures = [pool.submit(_analyze_one, task) for task in tasks]
+        for future in futures:
+            rows.append(future.result())
+            report_progress(len(rows) / len(tasks))
+    columns = ["speaker", "duration_s", "mean_f0", "median_f0", "min_f0", "max_f0",
+               "range_f0", "voiced_pct", "error"]
+    return pd.DataFrame(rows, columns=columns)
+
+
+def iter_wav_uploads(uploaded_files):
+    """Yield (speaker_name, wav_bytes) from uploaded WAV files and zip archives."""
+    import os
+    import zipfile
+
+    for uploaded in uploaded_files:
+        if uploaded.name.lower().endswith(".zip"):
+            with zipfile.ZipFile(uploaded) as archive:
+                for member in sorted(archive.namelist()):
+                    base = os.path.basename(member)
+                    if base.lower().endswith(".wav") and not base.startswith("."):
+                        yield os.path.splitext(base)[0], archive.read(member)
+        else:
+            yield os.path.splitext(uploaded.name)[0], uploaded.getvalue()
@@ -0,0 +1,73 @@
+"""Spectrogram rendering bounded by screen resolution rather than STFT size."""
+from io import BytesIO
+
+import numpy as np
+
+from utils.metrics import timed_function
+
+# Typical plot area on a laptop screen in the wide Streamlit layout
+DISPLAY_WIDTH = 1000
+DISPLAY_HEIGHT = 400
+
+
+def _block_edges(n, pixels):
+    """Start index of each block when n samples are folded into at most `pixels` blocks."""
+    if n <= pixels:
+        return np.arange(n)
+    return np.unique(np.linspace(0, n, pixels, endpoint=False).astype(int))
+
+
+def downsample_to_pixels(S_dB, times, freqs, width=DISPLAY_WIDTH, height=DISPLAY_HEIGHT):
+    """Max-pool a (freq, time) dB matrix down to at most height x width cells.
+
+    Max-pooling keeps narrow harmonics and bursts visible, which averaging
+    would wash out.
+    """
+    rows = _block_edges(S_dB.shape[0], height)
+    cols = _block_edges(S_dB.shape[1], width)
+    if S_dB.size:
+        S_dB = np.maximum.reduceat(np.maximum.reduceat(S_dB, rows, axis=0), cols, axis=1)
+    return S_dB, times[cols], freqs[rows]
+
+
+def _colormap_lut(cmap):
+    import matplotlib
+
+    return (matplotlib.colormaps[cmap](np.linspace(0, 1, 256))[:, :3] * 255).astype(np.uint8)
+
+
+@timed_function("plot_png")
+def render_spectrogram_png(S_dB, times, freqs, width=DISPLAY_WIDTH, height=DISPLAY_HEIGHT,
+                           cmap="magma", vmin=-80.0, vmax=0.0):
+    """Colour-map a dB matrix straight into PNG bytes, without a matplotlib figure."""
+    from PIL import Image
+
+    S_dB, _, _ = downsample_to_pixels(S_dB, times, freqs, width, height)
+    index = np.clip((S_dB - vmin) / (vmax - vmin) * 255, 0, 255).astype(np.uint8)
+    rgb = _colormap_lut(cmap)[index[::-1]]  # Low frequencies at the bottom
+    image = Image.fromarray(rgb)
+    if image.size != (width, height):
+        image = image.resize((width, height), Image.NEAREST)
+    buffer = BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@timed_function("plot_heatmap")
+def spectrogram_heatmap(S_dB, times, freqs, width=DISPLAY_WIDTH, height=DISPLAY_HEIGHT,
+                        cmap="magma", vmin=-80.0, vmax=0.0):
+    """Build a Plotly heatmap of a dB matrix downsampled to the display size."""
+    import plotly.graph_objects as go
+
+    S_dB, times, freqs = downsample_to_pixels(S_dB, times, freqs, width, height)
+    fig = go.Figure(data=go.Heatmap(
+        z=S_dB.astype(np.float32), x=times, y=freqs, zmin=vmin, zmax=vmax,
+        colorscale=cmap.capitalize(), colorbar=dict(title="dB"),
+    ))
+    fig.update_layout(
+        title="Frequency Spectrogram in Hz",
+        xaxis_title="Time (s)",
+        yaxis_title="Frequency (Hz)",
+        height=height,
+    )
+    return fig
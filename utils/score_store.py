@@ -0,0 +1,146 @@
+"""Persistent pronunciation scores with per-user running aggregates."""
+import atexit
+import os
+import sqlite3
+import threading
+import time
+
+from utils.dataset import DATA_DIR
+
+SCORE_DB_PATH = os.environ.get("PHONETICS_SCORE_DB", os.path.join(DATA_DIR, "pronunciation_scores.sqlite"))
+
+# Pending scores are written together once this many are queued or FLUSH_INTERVAL passes
+BATCH_SIZE = 50
+FLUSH_INTERVAL = 0.5
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scores (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    sentence TEXT,
+    score REAL NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS user_stats (
+    name TEXT PRIMARY KEY,
+    count INTEGER NOT NULL,
+    total REAL NOT NULL,
+    nonzero_count INTEGER NOT NULL,
+    nonzero_total REAL NOT NULL
+);
+"""
+
+_UPSERT_STATS = """
+INSERT INTO user_stats (name, count, total, nonzero_count, nonzero_total)
+VALUES (?, 1, ?, ?, ?)
+ON CONFLICT(name) DO UPDATE SET
+    count = count + 1,
+    total = total + excluded.total,
+    nonzero_count = nonzero_count + excluded.nonzero_count,
+    nonzero_total = nonzero_total + excluded.nonzero_total
+"""
+
+
+class ScoreStore:
+    """SQLite (WAL mode) score log plus incrementally maintained user_stats.
+
+    add() only queues a score; a background thread writes queued scores and
+    their aggregate updates in one transaction. Reads flush first, so a user
+    always sees their own latest submission.
+    """
+
+    def __init__(self, path=SCORE_DB_PATH, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._pending = []
+        self._pending_lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, name="score-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def add(self, name, score, sentence=None):
+        with self._pending_lock:
+            self._pending.append((name, sentence, float(score), time.time()))
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self._wake.set()
+
+    def flush(self):
+        """Write all queued scores and their aggregate updates in one transaction.
+
+        The database lock is held from taking the queue until the commit, so
+        a flush that finds the queue empty cannot return while another
+        thread's batch is still being written.
+        """
+        with self._db_lock:
+            with self._pending_lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return
+            try:
+                with self._conn:
+                    self._conn.executemany(
+                        "INSERT INTO scores (name, sentence, score, created_at) VALUES (?, ?, ?, ?)", batch)
+                    self._conn.executemany(_UPSERT_STATS, [
+                        (name, score, int(score > 0), score if score > 0 else 0.0)
+                        for name, _, score, _ in batch
+                    ])
+            except sqlite3.Error:
+                # The transaction was rolled back; queue the batch again
+                with self._pending_lock:
+                    self._pending[:0] = batch
+                raise
+
+    def _write_loop(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except sqlite3.Error:
+                pass  # The batch stays queued and is retried on the next tick
+
+    def stats(self, name):
+        """Return (count, total, nonzero_count, nonzero_total) for a user in O(1)."""
+        self.flush()
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT count, total, nonzero_count, nonzero_total FROM user_stats WHERE name = ?",
+                (name,)).fetchone()
+        return row or (0, 0.0, 0, 0.0)
+
+    def average(self, name):
+        """Average of a user's scores, ignoring zeros."""
+        _, _, nonzero_count, nonzero_total = self.stats(name)
+        return nonzero_total / nonzero_count if nonzero_count else 0.0
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._writer.join(timeout=5)
+        self.flush()
+        self._conn.close()
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def get_score_store():
+    """Return the process-wide score store."""
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = ScoreStore()
+        return _default_store
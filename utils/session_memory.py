@@ -0,0 +1,231 @@
+"""Per-session storage of audio and arrays under memory budgets.
+
+Values are kept compactly: audio as 16-bit PCM, uploads as their encoded
+bytes. Reads return what is stored (16-bit audio stays 16-bit, spilled
+arrays come back memory-mapped), so callers convert only what they
+analyse. Arrays that would push a session or the whole server over its
+memory budget are spilled, least recently used first, to memory-mapped
+files in a per-session temporary directory; sessions over their disk
+budget lose their least recently used entries. A session's values and
+files are removed once Streamlit no longer reports the session as active,
+after SESSION_IDLE_SECONDS without use, or at exit.
+"""
+import atexit
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from utils.audio_cache import _nbytes
+
+SESSION_MEMORY_BYTES = 32 * 1024 * 1024
+GLOBAL_MEMORY_BYTES = 512 * 1024 * 1024
+SESSION_DISK_BYTES = 512 * 1024 * 1024
+# Arrays smaller than this always stay in memory
+SPILL_MIN_BYTES = 256 * 1024
+SESSION_IDLE_SECONDS = 60 * 60
+SESSION_ROOT = os.path.join(tempfile.gettempdir(), "phonetics-class", f"sessions-{os.getpid()}")
+
+
+class _Entry:
+    __slots__ = ("value", "kind", "path", "nbytes")
+
+    def __init__(self, value, kind):
+        self.value = value
+        self.kind = kind  # "audio" values are int16 PCM
+        self.path = None
+        self.nbytes = _nbytes(value)
+
+    @property
+    def spilled(self):
+        return self.path is not None
+
+
+class SessionMemory:
+    """Values of one session; use via SessionMemoryManager.session()."""
+
+    def __init__(self, manager, session_id):
+        self.manager = manager
+        self.session_id = session_id
+        self.directory = os.path.join(manager.root, session_id)
+        self.entries = OrderedDict()
+        self.last_used = time.monotonic()
+        self._counter = 0
+
+    @property
+    def memory_bytes(self):
+        return sum(e.nbytes for e in self.entries.values() if not e.spilled)
+
+    @property
+    def disk_bytes(self):
+        return sum(e.nbytes for e in self.entries.values() if e.spilled)
+
+    def put_audio(self, name, y):
+        """Store float samples in [-1, 1] as 16-bit PCM (half the size of float32).
+
+        `get` returns the int16 array; see audio_cache.pcm16_to_float.
+        """
+        pcm = np.int16(np.clip(np.asarray(y, dtype=np.float32), -1.0, 1.0) * 32767)
+        self.manager._put(self, name, _Entry(pcm, "audio"))
+
+    def put(self, name, value):
+        """Store an array, bytes (e.g. the encoded upload) or any small value."""
+        self.manager._put(self, name, _Entry(value, "value"))
+
+    def get(self, name, default=None):
+        """The stored value; a spilled array is returned memory-mapped, not read in."""
+        return self.manager._get(self, name, default)
+
+    def discard(self, name):
+        """Remove a value (and its spill file) without reading it."""
+        self.manager._remove(self, name)
+
+    def __contains__(self, name):
+        return name in self.entries
+
+    def _spill(self, entry):
+        """Move an array to a memory-mapped file; returns False if it cannot be spilled."""
+        if not isinstance(entry.value, np.ndarray) or entry.nbytes < SPILL_MIN_BYTES:
+            return False
+        os.makedirs(self.directory, exist_ok=True)
+        self._counter += 1
+        path = os.path.join(self.directory, f"{self._counter}.npy")
+        np.save(path, entry.value)
+        entry.path = path
+        entry.value = None
+        return True
+
+    def _load(self, entry):
+        return np.load(entry.path, mmap_mode="r") if entry.spilled else entry.value
+
+    def _delete_file(self, entry):
+        if entry.spilled:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+
+class SessionMemoryManager:
+    """Budgets and LRU order for all sessions' values in this process."""
+
+    def __init__(self, root=SESSION_ROOT, session_bytes=SESSION_MEMORY_BYTES,
+                 global_bytes=GLOBAL_MEMORY_BYTES, session_disk_bytes=SESSION_DISK_BYTES):
+        self.root = root
+        self.session_bytes = session_bytes
+        self.global_bytes = global_bytes
+        self.session_disk_bytes = session_disk_bytes
+        self.sessions = {}
+        self.memory_bytes = 0
+        self._lru = OrderedDict()  # (session id, name) of in-memory entries, oldest first
+        self._lock = threading.RLock()
+
+    def session(self, session_id, is_active=None):
+        """SessionMemory for session_id; sessions for which is_active(id) is false are dropped."""
+        with self._lock:
+            self._sweep(is_active)
+            memory = self.sessions.get(session_id)
+            if memory is None:
+                memory = self.sessions[session_id] = SessionMemory(self, session_id)
+            memory.last_used = time.monotonic()
+            return memory
+
+    def _put(self, memory, name, entry):
+        with self._lock:
+            self._remove(memory, name)
+            memory.entries[name] = entry
+            self._lru[(memory.session_id, name)] = None
+            self.memory_bytes += entry.nbytes
+            self._enforce(memory)
+
+    def _get(self, memory, name, default):
+        with self._lock:
+            entry = memory.entries.get(name)
+            if entry is None:
+                return default
+            memory.entries.move_to_end(name)
+            if (memory.session_id, name) in self._lru:
+                self._lru.move_to_end((memory.session_id, name))
+            return memory._load(entry)
+
+    def _remove(self, memory, name):
+        with self._lock:
+            entry = memory.entries.pop(name, None)
+            if entry is None:
+                return
+            if (memory.session_id, name) in self._lru:
+                del self._lru[(memory.session_id, name)]
+                self.memory_bytes -= entry.nbytes
+            memory._delete_file(entry)
+
+    def _enforce(self, memory):
+        """Spill LRU arrays until the session and global memory budgets hold, then trim disk."""
+        for key in list(self._lru):
+            session_over = memory.memory_bytes > self.session_bytes
+            if not session_over and self.memory_bytes <= self.global_bytes:
+                break
+            session_id, name = key
+            if session_over and session_id != memory.session_id:
+                continue
+            owner = self.sessions[session_id]
+            entry = owner.entries[name]
+            if owner._spill(entry):
+                del self._lru[key]
+                self.memory_bytes -= entry.nbytes
+        for name in list(memory.entries):
+            if memory.disk_bytes <= self.session_disk_bytes:
+                break
+            if memory.entries[name].spilled:
+                self._remove(memory, name)
+
+    def drop_session(self, session_id):
+        """Forget a session's values and delete its directory."""
+        with self._lock:
+            memory = self.sessions.pop(session_id, None)
+            if memory is None:
+                return
+            for name in list(memory.entries):
+                self._remove(memory, name)
+            shutil.rmtree(memory.directory, ignore_errors=True)
+
+    def _sweep(self, is_active=None):
+        cutoff = time.monotonic() - SESSION_IDLE_SECONDS
+        for session_id, memory in list(self.sessions.items()):
+            if memory.last_used < cutoff or (is_active is not None and not is_active(session_id)):
+                self.drop_session(session_id)
+
+    def close(self):
+        for session_id in list(self.sessions):
+            self.drop_session(session_id)
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+_default_manager = None
+_default_lock = threading.Lock()
+
+
+def get_session_memory_manager():
+    """Return the process-wide manager; its files are removed at exit."""
+    global _default_manager
+    with _default_lock:
+        if _default_manager is None:
+            _default_manager = SessionMemoryManager()
+            atexit.register(_default_manager.close)
+    return _default_manager
+
+
+def get_session_memory():
+    """SessionMemory of the Streamlit session running this script.
+
+    Each call also drops the values of sessions that have ended.
+    """
+    from streamlit import runtime
+
+    from utils.jobs import session_id
+
+    is_active = runtime.get_instance().is_active_session if runtime.exists() else None
+    return get_session_memory_manager().session(session_id(), is_active)
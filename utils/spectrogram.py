@@ -0,0 +1,91 @@
+"""Per-file spectrogram engine: STFT once, then zoom and pan by slicing."""
+from collections import namedtuple
+
+import numpy as np
+
+from utils.audio_cache import LRUCache
+from utils.metrics import timed_function
+
+# (n_fft, hop_length) pairs from fine time resolution to fine frequency resolution
+PYRAMID_LEVELS = ((512, 128), (1024, 256), (2048, 512))
+
+# Number of STFT frames worth drawing across the plot width
+TARGET_FRAMES = 800
+
+SPECTROGRAM_CACHE_BYTES = 512 * 1024 * 1024
+
+SpectrogramView = namedtuple("SpectrogramView", ["S_dB", "times", "freqs", "hop_length"])
+
+
+def _pick_level(levels, duration, sr):
+    """Pick the coarsest level that still gives TARGET_FRAMES across the window."""
+    for level in reversed(levels):
+        if duration * sr / level[1] >= TARGET_FRAMES:
+            return level
+    return levels[0]
+
+
+class SpectrogramEngine:
+    """Magnitude STFTs of one recording at several time/frequency resolutions."""
+
+    @timed_function("stft")
+    def __init__(self, y, sr, levels=PYRAMID_LEVELS):
+        import librosa
+
+        self.sr = sr
+        self.duration = len(y) / sr
+        self.levels = []
+        for n_fft, hop_length in levels:
+            S = np.abs(librosa.stft(y, n_fft=n_fft, hop_length=hop_length)).astype(np.float32)
+            freqs = librosa.fft_frequencies(sr=sr, n_fft=n_fft)
+            self.levels.append((n_fft, hop_length, S, freqs))
+        # One dB reference for the whole file keeps colours stable while panning
+        self.ref = max(float(S.max()) for _, _, S, _ in self.levels) or 1.0
+
+    @property
+    def nbytes(self):
+        return sum(S.nbytes for _, _, S, _ in self.levels)
+
+    def view(self, time_min, time_max, freq_min, freq_max):
+        """Return the dB spectrogram of a time/frequency window by slicing."""
+        import librosa
+
+        n_fft, hop_length, S, freqs = _pick_level(self.levels, time_max - time_min, self.sr)
+        t0 = max(int(np.floor(time_min * self.sr / hop_length)), 0)
+        t1 = min(int(np.ceil(time_max * self.sr / hop_length)) + 1, S.shape[1])
+        f0 = int(np.searchsorted(freqs, freq_min, side="left"))
+        f1 = int(np.searchsorted(freqs, freq_max, side="right"))
+        # Crop first so the dB conversion only touches the bins that are shown
+        S_dB = librosa.amplitude_to_db(S[f0:f1, t0:t1], ref=self.ref)
+        times = np.arange(t0, t1) * hop_length / self.sr
+        return SpectrogramView(S_dB, times, freqs[f0:f1], hop_length)
+
+
+_engines = LRUCache(SPECTROGRAM_CACHE_BYTES, sizeof=lambda engine: engine.nbytes, name="spectrograms")
+
+
+def get_spectrogram_engine(key, y, sr):
+    """Return the engine for a recording, building it on first use."""
+    return _engines.get_or_compute(key, lambda: SpectrogramEngine(y, sr))
+
+
+@timed_function("stft_window")
+def window_view(reader, time_min, time_max, freq_min, freq_max):
+    """SpectrogramView of one window of a WindowedReader, decoding only that window.
+
+    The window is read with n_fft / 2 samples of context on each side, so
+    its frames match a centred whole-file STFT. Without the whole file the
+    dB reference is the loudest bin of the window.
+    """
+    import librosa
+
+    n_fft, hop_length = _pick_level(PYRAMID_LEVELS, time_max - time_min, reader.sr)
+    y, start = reader.read(time_min, time_max, pad=n_fft // 2)
+    S = np.abs(librosa.stft(y, n_fft=n_fft, hop_length=hop_length, center=False))
+    freqs = librosa.fft_frequencies(sr=reader.sr, n_fft=n_fft)
+    f0 = int(np.searchsorted(freqs, freq_min, side="left"))
+    f1 = int(np.searchsorted(freqs, freq_max, side="right"))
+    S = S[f0:f1]
+    S_dB = librosa.amplitude_to_db(S, ref=float(S.max(initial=0.0)) or 1.0)
+    times = (start + n_fft // 2 + np.arange(S.shape[1]) * hop_length) / reader.sr
+    return SpectrogramView(S_dB, times, freqs[f0:f1], hop_length)
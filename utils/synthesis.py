@@ -0,0 +1,126 @@
+"""Additive synthesis of arbitrary partial tables at audio rate."""
+import hashlib
+
+import numpy as np
+
+from utils.audio_cache import LRUCache, to_wav_bytes
+from utils.metrics import timed_function
+
+SAMPLE_RATE = 44100
+# Samples rendered per broadcast step; bounds the (samples x partials) matrix
+CHUNK_SAMPLES = 8192
+
+PRESETS = ("Sawtooth", "Square", "Triangle", "Glottal-like")
+
+_rendered = LRUCache(128 * 1024 * 1024, name="synthesis")
+
+
+def generate_wave(amplitude, frequency, time):
+    """Generate sinusoidal wave data based on amplitude, frequency, and time."""
+    return amplitude * np.sin(2 * np.pi * frequency * time)
+
+
+def generate_tone(frequency, duration=1, sample_rate=44100, amplitude=0.3):
+    """Generate a pure tone based on the frequency."""
+    t = np.linspace(0, duration, int(sample_rate * duration), False)
+    tone = amplitude * np.sin(2 * np.pi * frequency * t)
+    tone_int16 = np.int16(tone / np.max(np.abs(tone)) * 32767)  # Convert to 16-bit data
+    return tone_int16, t, tone
+
+
+def harmonic_preset(name, f0, n_partials, sr=SAMPLE_RATE):
+    """Amplitudes, frequencies and phases of a harmonic series preset.
+
+    Partials at or above the Nyquist frequency are dropped.
+    """
+    k = np.arange(1, n_partials + 1, dtype=np.float64)
+    phases = np.zeros_like(k)
+    if name == "Sawtooth":
+        amps = 1 / k
+    elif name == "Square":
+        amps = np.where(k % 2 == 1, 1 / k, 0.0)
+    elif name == "Triangle":
+        amps = np.where(k % 2 == 1, 1 / k ** 2, 0.0)
+        phases = np.where(k % 4 == 3, np.pi, 0.0)  # Alternate signs of the odd harmonics
+    elif name == "Glottal-like":
+        amps = 1 / k ** 2  # Source spectrum falling about 12 dB per octave
+    else:
+        raise ValueError(f"Unknown preset: {name!r}")
+    freqs = k * f0
+    keep = (amps > 0) & (freqs < sr / 2)
+    return amps[keep], freqs[keep], phases[keep]
+
+
+def additive_synth(amps, freqs, phases, duration, sr=SAMPLE_RATE):
+    """Sum of amplitude * sin(2 pi f t + phase) over all partials.
+
+    Each chunk of samples is one broadcast (samples x partials) sine followed
+    by a matrix-vector product with the amplitudes, so hundreds of partials
+    cost a few array operations rather than a Python loop per partial.
+    """
+    amps = np.asarray(amps, dtype=np.float64)
+    omega = 2 * np.pi * np.asarray(freqs, dtype=np.float64)
+    phases = np.asarray(phases, dtype=np.float64)
+    n = int(round(duration * sr))
+    out = np.empty(n, dtype=np.float64)
+    for start in range(0, n, CHUNK_SAMPLES):
+        t = np.arange(start, min(start + CHUNK_SAMPLES, n))[:, None] / sr
+        out[start:start + len(t)] = np.sin(t * omega + phases) @ amps
+    return np.arange(n) / sr, out
+
+
+def _harmonic_numbers(freqs):
+    """Integer harmonic numbers if all freqs are multiples of the lowest one, else None."""
+    freqs = np.asarray(freqs, dtype=np.float64)
+    if len(freqs) == 0 or freqs.min() <= 0:
+        return None
+    ratios = freqs / freqs.min()
+    harmonics = np.round(ratios)
+    return harmonics.astype(int) if np.allclose(ratios, harmonics, atol=1e-9) else None
+
+
+def wavetable_synth(amps, harmonics, phases, f0, duration, sr=SAMPLE_RATE):
+    """Harmonic series rendered from one inverse-FFT period.
+
+    One period is built with irfft (each partial is a single bin), then read
+    out with a phase accumulator and linear interpolation, so the cost is
+    independent of the number of partials.
+    """
+    size = max(4096, 1 << int(np.ceil(np.log2(4 * (int(np.max(harmonics)) + 1)))))
+    spectrum = np.zeros(size // 2 + 1, dtype=np.complex128)
+    np.add.at(spectrum, harmonics, np.asarray(amps) * size / 2 * np.exp(1j * (np.asarray(phases) - np.pi / 2)))
+    table = np.fft.irfft(spectrum, size)
+    table = np.append(table, table[0])  # Wrap-around sample for interpolation
+
+    n = int(round(duration * sr))
+    position = (np.arange(n) * (f0 / sr) % 1.0) * size
+    index = position.astype(int)
+    frac = position - index
+    return np.arange(n) / sr, table[index] * (1 - frac) + table[index + 1] * frac
+
+
+def _param_key(amps, freqs, phases, duration, sr):
+    h = hashlib.sha1()
+    for array in (amps, freqs, phases):
+        h.update(np.ascontiguousarray(array, dtype=np.float64).tobytes())
+    h.update(repr((float(duration), int(sr))).encode())
+    return h.hexdigest()
+
+
+def render_partials(amps, freqs, phases, duration, sr=SAMPLE_RATE):
+    """Return (wav_bytes, t, wave), cached by a hash of all parameters.
+
+    Harmonic tables use the wavetable path; anything else is summed directly.
+    The WAV is peak-normalised for playback; `wave` keeps the true amplitude.
+    """
+    @timed_function("synthesis")
+    def render():
+        harmonics = _harmonic_numbers(freqs)
+        if harmonics is not None:
+            t, wave = wavetable_synth(amps, harmonics, phases, np.min(freqs), duration, sr)
+        else:
+            t, wave = additive_synth(amps, freqs, phases, duration, sr)
+        peak = np.max(np.abs(wave)) if len(wave) else 0
+        return to_wav_bytes(wave / peak * 0.9 if peak > 0 else wave, sr), t, wave
+
+    return _rendered.get_or_compute(_param_key(amps, freqs, phases, duration, sr), render)
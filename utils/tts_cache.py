@@ -0,0 +1,103 @@
+"""Content-addressed on-disk cache of synthesized speech."""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from io import BytesIO
+
+from utils.metrics import register_cache, timed
+
+# Disk budget for cached speech; least recently used files are removed first
+TTS_CACHE_BYTES = 200 * 1024 * 1024
+TTS_CACHE_DIR = os.environ.get(
+    "PHONETICS_TTS_CACHE_DIR", os.path.join(tempfile.gettempdir(), "phonetics-class", "tts")
+)
+
+
+def gtts_synthesizer(text, lang, tld=None):
+    """Synthesize speech with Google Text-to-Speech and return MP3 bytes."""
+    from gtts import gTTS
+
+    tts = gTTS(text=text, lang=lang, tld=tld) if tld else gTTS(text=text, lang=lang)
+    buffer = BytesIO()
+    tts.write_to_fp(buffer)
+    return buffer.getvalue()
+
+
+class TTSCache:
+    """Speech audio stored on disk under a hash of (text, lang, tld).
+
+    `synthesizer` is any callable (text, lang, tld) -> bytes, so a local
+    stand-in can replace gTTS. The directory is kept under max_bytes by
+    deleting the least recently used entries.
+    """
+
+    def __init__(self, directory=TTS_CACHE_DIR, max_bytes=TTS_CACHE_BYTES,
+                 synthesizer=gtts_synthesizer, suffix=".mp3"):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.synthesizer = synthesizer
+        self.suffix = suffix
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(text, lang, tld=None):
+        return hashlib.sha1(json.dumps([text, lang, tld]).encode("utf-8")).hexdigest()
+
+    def path(self, text, lang, tld=None):
+        return os.path.join(self.directory, self.key(text, lang, tld) + self.suffix)
+
+    def get(self, text, lang, tld=None):
+        """Return audio bytes for the text, synthesizing only on a cache miss."""
+        path = self.path(text, lang, tld)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # Mark as recently used
+            self.hits += 1
+            return data
+        except FileNotFoundError:
+            pass
+        self.misses += 1
+        with timed("tts"):
+            data = self.synthesizer(text, lang, tld)
+        # Write to a temporary name first so readers never see partial files
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self._evict()
+        return data
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(self.suffix):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except FileNotFoundError:
+                    pass
+
+
+_default_cache = None
+
+
+def get_tts_cache():
+    """Return the process-wide TTS cache shared by all pages."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = TTSCache()
+        register_cache("tts", _default_cache)
+    return _default_cache
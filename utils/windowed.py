@@ -0,0 +1,59 @@
+"""Random access to a time window of an audio file without decoding the rest."""
+from io import BytesIO
+
+import numpy as np
+
+from utils.metrics import timed_function
+
+# Recordings up to this length are decoded whole and cached; longer ones are read by window
+WINDOWED_THRESHOLD_SECONDS = 60.0
+
+
+class WindowedReader:
+    """Seekable reader over a WAV (or any libsndfile format) upload.
+
+    `read` seeks to the first requested sample and decodes only the window,
+    plus optional padding on each side for STFT or pitch analysis context, so
+    its cost follows the window length rather than the file length.
+    """
+
+    def __init__(self, source):
+        import soundfile as sf
+
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            source = BytesIO(source)
+        elif hasattr(source, "seek"):
+            source.seek(0)
+        self._file = sf.SoundFile(source)
+        self.sr = self._file.samplerate
+        self.frames = self._file.frames
+
+    @property
+    def duration(self):
+        return self.frames / self.sr
+
+    @timed_function("window_read")
+    def read(self, time_min, time_max, pad=0):
+        """Mono float32 samples of [time_min, time_max] with `pad` samples of context per side.
+
+        Context beyond the ends of the file is zero-filled, matching the
+        centre padding of a whole-file STFT. Returns (y, start) where start is
+        the sample index of y[0] in the file (negative when zero-filled).
+        """
+        start = int(round(time_min * self.sr)) - pad
+        stop = min(int(round(time_max * self.sr)), self.frames) + pad
+        read_from, read_to = max(start, 0), min(stop, self.frames)
+        self._file.seek(read_from)
+        block = self._file.read(max(read_to - read_from, 0), dtype="float32", always_2d=True).mean(axis=1)
+        y = np.pad(block, (read_from - start, stop - read_to))
+        return y, start
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
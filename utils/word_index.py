@@ -0,0 +1,105 @@
+"""Indexes over the stress dataset for instant filtering and search."""
+import bisect
+import unicodedata
+from collections import defaultdict
+
+# Stress and syllable marks ignored when matching transcriptions
+IPA_MARKS = "ˈˌ.ː/[] "
+NGRAM_SIZES = (1, 2, 3)
+
+
+def normalize_ipa(text):
+    """Drop stress/length marks and slashes so IPA fragments match loosely."""
+    text = unicodedata.normalize("NFC", str(text))
+    return "".join(ch for ch in text if ch not in IPA_MARKS)
+
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class WordIndex:
+    """Stress slices, a sorted-prefix index and n-gram indexes built once.
+
+    Rows keep their original index labels, so the numbers shown next to words
+    are the same as in the dataset.
+    """
+
+    def __init__(self, df):
+        # Stable sort so words keep their dataset order within each stress group
+        self.df = df.sort_values("Stress", kind="stable")
+        stresses = self.df["Stress"].tolist()
+        self.stress_slices = {}
+        for position, stress in enumerate(stresses):
+            start = self.stress_slices.get(stress, slice(position, position)).start
+            self.stress_slices[stress] = slice(start, position + 1)
+
+        labels = self.df.index.tolist()
+        words = self.df["Word"].astype(str).str.lower().tolist()
+        ipa = [normalize_ipa(t) for t in self.df["Transcription"].fillna("")]
+        self.labels = set(labels)
+
+        # Sorted (word, label) pairs answer prefix queries with two bisections
+        self._prefix_keys = sorted(zip(words, labels))
+        self._words = dict(zip(labels, words))
+
+        self._word_trigrams = defaultdict(set)
+        self._ipa_ngrams = defaultdict(set)
+        for label, word, transcription in zip(labels, words, ipa):
+            for gram in _trigrams(word):
+                self._word_trigrams[gram].add(label)
+            for n in NGRAM_SIZES:
+                for i in range(len(transcription) - n + 1):
+                    self._ipa_ngrams[transcription[i:i + n]].add(label)
+        self._ipa = dict(zip(labels, ipa))
+
+    def by_stress(self, stress):
+        """Rows with the given stress, as a slice of the pre-sorted frame."""
+        return self.df.iloc[self.stress_slices.get(stress, slice(0, 0))]
+
+    def prefix(self, query, limit=10):
+        query = query.lower()
+        start = bisect.bisect_left(self._prefix_keys, (query,))
+        matches = []
+        for word, label in self._prefix_keys[start:start + limit]:
+            if not word.startswith(query):
+                break
+            matches.append(label)
+        return matches
+
+    def ipa_substring(self, query, limit=10):
+        """Rows whose transcription contains the fragment (stress marks ignored)."""
+        query = normalize_ipa(query)
+        if not query:
+            return []
+        n = min(len(query), max(NGRAM_SIZES))
+        grams = [query[i:i + n] for i in range(len(query) - n + 1)]
+        candidates = set.intersection(*(self._ipa_ngrams.get(g, set()) for g in grams))
+        return sorted(label for label in candidates if query in self._ipa[label])[:limit]
+
+    def fuzzy(self, query, limit=10, min_score=0.3):
+        """Rows whose word shares the most trigrams with the query (Dice coefficient)."""
+        grams = _trigrams(query.lower())
+        shared = defaultdict(int)
+        for gram in grams:
+            for label in self._word_trigrams.get(gram, ()):
+                shared[label] += 1
+        scored = []
+        for label, count in shared.items():
+            score = 2 * count / (len(grams) + len(_trigrams(self._words[label])))
+            if score >= min_score:
+                scored.append((-score, label))
+        return [label for _, label in sorted(scored)[:limit]]
+
+    def search(self, query, limit=10):
+        """Row labels matching a row number, word prefix, IPA fragment or misspelling."""
+        query = query.strip()
+        if not query:
+            return []
+        if query.isdigit():
+            return [int(query)] if int(query) in self.labels else []
+        results = list(dict.fromkeys(self.prefix(query, limit) + self.ipa_substring(query, limit)))
+        if len(results) < limit:
+            results += [label for label in self.fuzzy(query, limit) if label not in results]
+        return results[:limit]